@@ -13,7 +13,6 @@
 # limitations under the License
 
 import argparse
-import json
 import logging
 import time
 from types import SimpleNamespace
@@ -25,6 +24,7 @@ import simulstream
 from simulstream.client.wav_reader_client import load_wav_file_list, read_wav_file
 from simulstream.config import yaml_config
 from simulstream.metrics.logger import setup_metrics_logger, METRICS_LOGGER
+from simulstream.server.json_utils import json_dumps
 from simulstream.server.message_processor import MessageProcessor
 from simulstream.server.speech_processors import build_speech_processor, SpeechProcessor
 
@@ -117,9 +117,9 @@ def main(args: argparse.Namespace):
     speech_processor = build_speech_processor(speech_processor_config)
     speech_processor_loading_time = time.time() - speech_processor_loading_time
     LOGGER.info(f"Loaded speech processor in {speech_processor_loading_time:.3f} seconds")
-    METRICS_LOGGER.info(json.dumps({
+    METRICS_LOGGER.info(json_dumps({
         "model_loading_time": speech_processor_loading_time,
-    }))
+    }).decode("utf-8"))
     wav_files = load_wav_file_list(args.wav_list_file)
     run_inference(speech_processor, wav_files, args.tgt_lang, args.src_lang)
 
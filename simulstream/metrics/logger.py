@@ -12,21 +12,64 @@
 # See the License for the specific language governing permissions and
 # limitations under the License
 
+import atexit
 import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
 
 
 METRICS_LOGGER = logging.getLogger('fbk_fairseq.simultaneous.metrics')
 METRICS_LOGGER.propagate = False
+_METRICS_LISTENER: Optional[QueueListener] = None
 
 
 def setup_metrics_logger(metrics_config):
+    """
+    Configures the :data:`METRICS_LOGGER` to write the metrics to the configured file.
+
+    The records are written to the file by a background thread, so that the threads logging the
+    metrics (e.g., while processing a chunk of audio) are not blocked by the file writes.
+    """
     if metrics_config.enabled:
-        fh = logging.FileHandler(metrics_config.filename)
+        fh = logging.FileHandler(metrics_config.filename, encoding="utf-8")
         formatter = logging.Formatter('%(message)s')
         fh.setFormatter(formatter)
-
-        # Clear existing handlers (if any) and set new one
-        METRICS_LOGGER.handlers.clear()
-        METRICS_LOGGER.addHandler(fh)
+        _start_metrics_listener(fh)
     else:
         METRICS_LOGGER.disabled = True
+
+
+def _start_metrics_listener(handler: logging.Handler):
+    global _METRICS_LISTENER
+    shutdown_metrics_logger()
+    records_queue = queue.SimpleQueue()
+    _METRICS_LISTENER = QueueListener(records_queue, handler)
+    _METRICS_LISTENER.start()
+    # Clear existing handlers (if any) and set new one
+    METRICS_LOGGER.handlers.clear()
+    METRICS_LOGGER.addHandler(QueueHandler(records_queue))
+
+
+def shutdown_metrics_logger():
+    """
+    Writes all the pending metrics records and stops the background thread writing them.
+    """
+    global _METRICS_LISTENER
+    if _METRICS_LISTENER is not None:
+        _METRICS_LISTENER.stop()
+        _METRICS_LISTENER = None
+
+
+def _restart_metrics_listener_after_fork():
+    # the thread writing the records is not running in the forked process
+    global _METRICS_LISTENER
+    if _METRICS_LISTENER is not None:
+        handler = _METRICS_LISTENER.handlers[0]
+        _METRICS_LISTENER = None
+        _start_metrics_listener(handler)
+
+
+atexit.register(shutdown_metrics_logger)
+os.register_at_fork(after_in_child=_restart_metrics_listener_after_fork)
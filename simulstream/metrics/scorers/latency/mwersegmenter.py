@@ -110,23 +110,17 @@ class MWERSegmenterBasedLatencyScorer(LatencyScorer):
         Borrowed from
         https://github.com/mjpost/mweralign/blob/d23a5479/mweralign/mweralign.py#L147
         """
-        if self.segmenter is not None:
-            tokenized_text = []
-            for i in range(len(text)):
-                if " ### " in text[i]:
-                    pieces = text[i].strip().split(" ### ")
-                    encoded = [" ".join(self.segmenter.encode(p)) for p in pieces]
-                    tokenized_text.append(" ### ".join(encoded))
-                elif "\t" in text[i]:
-                    pieces = text[i].strip().split("\t")
-                    # underlying C++ binary still uses ###
-                    encoded = [" ".join(self.segmenter.encode(p)) for p in pieces]
-                    tokenized_text.append(" ### ".join(encoded))
-                else:
-                    tokenized_text.append(" ".join(self.segmenter.encode(text[i].strip())))
-            return "\n".join(tokenized_text)
-        else:
+        if self.segmenter is None:
             return "\n".join(text)
+        encode = self.segmenter.encode
+        tokenized_text = []
+        for line in text:
+            # pieces are separated by either ### or tabs (a line without separators is a single
+            # piece), but the underlying C++ binary still uses ### for both
+            separator = " ### " if " ### " in line else "\t"
+            tokenized_text.append(" ### ".join(
+                [" ".join(encode(piece)) for piece in line.strip().split(separator)]))
+        return "\n".join(tokenized_text)
 
     def score(self, samples: List[LatencyScoringSample]) -> LatencyScores:
         resegmented_samples = []
@@ -14,7 +14,8 @@
 
 from abc import abstractmethod
 from dataclasses import dataclass
-from typing import List, Optional
+from functools import lru_cache
+from typing import List, Optional, Dict, Tuple
 
 from mweralign import mweralign
 from mweralign.segmenter import CJSegmenter
@@ -61,6 +62,10 @@ class MWERSegmenterBasedQualityScorer(QualityScorer):
     def __init__(self, args):
         super().__init__(args)
         self.segmenter = CJSegmenter() if args.latency_unit == "char" else None
+        # references do not change across calls to score, so their tokenization is cached
+        self._tokenized_references_cache: Dict[Tuple[str, Tuple[str, ...]], str] = {}
+        self._tokenize_hypothesis = lru_cache(maxsize=1024)(
+            lambda hypothesis: self._tokenize([hypothesis]))
 
     def requires_reference(self) -> bool:
         return True
@@ -88,30 +93,28 @@ class MWERSegmenterBasedQualityScorer(QualityScorer):
         Borrowed from
         https://github.com/mjpost/mweralign/blob/d23a5479/mweralign/mweralign.py#L147
         """
-        if self.segmenter is not None:
-            tokenized_text = []
-            for i in range(len(text)):
-                if " ### " in text[i]:
-                    pieces = text[i].strip().split(" ### ")
-                    encoded = [" ".join(self.segmenter.encode(p)) for p in pieces]
-                    tokenized_text.append(" ### ".join(encoded))
-                elif "\t" in text[i]:
-                    pieces = text[i].strip().split("\t")
-                    # underlying C++ binary still uses ###
-                    encoded = [" ".join(self.segmenter.encode(p)) for p in pieces]
-                    tokenized_text.append(" ### ".join(encoded))
-                else:
-                    tokenized_text.append(" ".join(self.segmenter.encode(text[i].strip())))
-            return "\n".join(tokenized_text)
-        else:
+        if self.segmenter is None:
             return "\n".join(text)
+        encode = self.segmenter.encode
+        tokenized_text = []
+        for line in text:
+            # pieces are separated by either ### or tabs (a line without separators is a single
+            # piece), but the underlying C++ binary still uses ### for both
+            separator = " ### " if " ### " in line else "\t"
+            tokenized_text.append(" ### ".join(
+                [" ".join(encode(piece)) for piece in line.strip().split(separator)]))
+        return "\n".join(tokenized_text)
 
     def score(self, samples: List[QualityScoringSample]) -> float:
         resegmented_samples = []
         for sample in samples:
             assert sample.reference is not None, "Cannot realign hypothesis to missing reference"
-            hypo = self._tokenize([sample.hypothesis])
-            refs = self._tokenize(sample.reference)
+            hypo = self._tokenize_hypothesis(sample.hypothesis)
+            refs_key = (sample.audio_name, tuple(sample.reference))
+            refs = self._tokenized_references_cache.get(refs_key)
+            if refs is None:
+                refs = self._tokenize(sample.reference)
+                self._tokenized_references_cache[refs_key] = refs
             resegmented_hypos = mweralign.align_texts(refs, hypo).split("\n")
 
             assert len(sample.reference) == len(resegmented_hypos), \
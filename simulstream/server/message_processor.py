@@ -12,15 +12,17 @@
 # See the License for the specific language governing permissions and
 # limitations under the License
 
-import json
 import logging
+import threading
 import time
+from contextlib import nullcontext
 from typing import Optional
 
-import librosa
 import numpy as np
+import soxr
 
 from simulstream.metrics.logger import METRICS_LOGGER
+from simulstream.server.json_utils import json_dumps
 from simulstream.server.speech_processors import SpeechProcessor, SAMPLE_RATE
 from simulstream.server.speech_processors.incremental_output import merge_incremental_outputs, \
     IncrementalOutput
@@ -34,13 +36,30 @@ class MessageProcessor:
     This class is responsible for processing the messages incoming from a client, which include
     control messages (e.g., configurations about languages to use, or signal that the stream is
     over).
+
+    Args:
+        client_id (int): Identifier of the client, used in the logs.
+        speech_processor (SpeechProcessor): The speech processor to use.
+        inference_lock (threading.Semaphore, optional): If set, it is acquired for each call to
+            the speech processor, so that it can be shared by multiple message processors to
+            limit how many speech processors run at the same time (e.g., on a single GPU). The
+            other operations, such as resampling, are performed outside of it.
     """
-    def __init__(self, client_id: int, speech_processor: SpeechProcessor):
-        self.client_buffer = b''
+    def __init__(
+            self,
+            client_id: int,
+            speech_processor: SpeechProcessor,
+            inference_lock: Optional[threading.Semaphore] = None):
+        self.client_buffer = bytearray()
         self.processed_audio_seconds = 0
         self.sample_rate = SAMPLE_RATE
         self.client_id = client_id
         self.speech_processor = speech_processor
+        self._inference_lock = inference_lock if inference_lock is not None else nullcontext()
+        self._resampler = None
+        # audio already converted (and resampled) but not processed yet, e.g. because it was
+        # received before a change of the sample rate
+        self._pending_waveform = np.empty(0, dtype=np.float32)
 
     def process_speech(self, speech_data: bytes) -> Optional[IncrementalOutput]:
         """
@@ -55,40 +74,63 @@ class MessageProcessor:
         Returns:
             IncrementalOutput: incremental processing results, if any. None otherwise.
         """
-        self.client_buffer += speech_data
+        # the bytearray is extended in place, instead of copying all the buffered audio
+        self.client_buffer.extend(speech_data)
         # we have SAMPLE_RATE * 2 bytes (int16) samples every second
         buffer_len_seconds = len(self.client_buffer) / 2 / self.sample_rate
-        if buffer_len_seconds >= self.speech_processor.speech_chunk_size:
+        pending_len_seconds = len(self._pending_waveform) / SAMPLE_RATE
+        if buffer_len_seconds + pending_len_seconds >= self.speech_processor.speech_chunk_size:
             self.processed_audio_seconds += buffer_len_seconds
             start_time = time.time()
             incremental_output = self._run_speech_processor()
             end_time = time.time()
-            METRICS_LOGGER.info(json.dumps({
+            self._log_metrics({
                 "id": self.client_id,
                 "total_audio_processed": self.processed_audio_seconds,
                 "computation_time": end_time - start_time,
                 "generated_tokens": incremental_output.new_tokens,
                 "deleted_tokens": incremental_output.deleted_tokens,
-            }))
+            })
             return incremental_output
         else:
             return None
 
-    def _run_speech_processor(self) -> IncrementalOutput:
+    def _run_speech_processor(self, last: bool = False) -> IncrementalOutput:
+        """
+        This function forwards the buffered audio (see :meth:`_buffered_waveform`) to the given
+        class:`~simulstream.server.speech_processors.SpeechProcessor`.
+        """
+        float32_waveform = self._buffered_waveform(last=last)
+        with self._inference_lock:
+            return self.speech_processor.process_chunk(float32_waveform)
+
+    def _buffered_waveform(self, last: bool = False) -> np.ndarray:
         """
-        This function converts raw ``int16`` PCM audio to normalized ``float32``,
+        This function converts the buffered raw ``int16`` PCM audio to normalized ``float32``,
         resamples it if necessary to :data:`~simulstream.server.speech_processors.SAMPLE_RATE`,
-        and forwards it to the given class:`~simulstream.server.speech_processors.SpeechProcessor`.
-        Processing statistics are logged using the metrics logger.
+        and returns it after the pending audio, emptying the buffer.
+
+        The audio is resampled as a continuous stream, so that the resampling filter is built only
+        once per stream and there are no artifacts at the boundaries of the chunks. As the
+        resampler holds back the last few samples, ``last`` has to be set for the last chunk of
+        the stream, or before changing the sample rate, to flush them.
         """
-        int16_waveform = np.frombuffer(self.client_buffer, dtype=np.int16)
-        float32_waveform = int16_waveform.astype(np.float32) / 2 ** 15
+        # a single (fused) operation avoids allocating an intermediate float32 copy of the
+        # samples, and multiplying by 2 ** -15 is exact as it is a power of two. The int16 view
+        # over the buffer is not stored, as the buffer cannot be cleared while it is referenced
+        float32_waveform = np.multiply(
+            np.frombuffer(self.client_buffer, dtype=np.int16), np.float32(2 ** -15),
+            dtype=np.float32)
+        self.client_buffer.clear()
         if self.sample_rate != SAMPLE_RATE:
-            float32_waveform = librosa.resample(
-                float32_waveform, orig_sr=self.sample_rate, target_sr=SAMPLE_RATE)
-        incremental_output = self.speech_processor.process_chunk(float32_waveform)
-        self.client_buffer = b''
-        return incremental_output
+            if self._resampler is None:
+                self._resampler = soxr.ResampleStream(
+                    self.sample_rate, SAMPLE_RATE, 1, dtype="float32", quality="HQ")
+            float32_waveform = self._resampler.resample_chunk(float32_waveform, last=last)
+        if len(self._pending_waveform) > 0:
+            float32_waveform = np.concatenate((self._pending_waveform, float32_waveform))
+            self._pending_waveform = np.empty(0, dtype=np.float32)
+        return float32_waveform
 
     def process_metadata(self, metadata: dict):
         """
@@ -98,24 +140,51 @@ class MessageProcessor:
         Args:
             metadata (dict): Dictionary of metadata regarding the incoming speech.
         """
-        if 'sample_rate' in metadata:
-            self.sample_rate = int(metadata['sample_rate'])
-        if 'target_lang' in metadata:
-            self.speech_processor.set_target_language(metadata["target_lang"])
-            LOGGER.debug(
-                f"Client {self.client_id} target language set to: "
-                f"{metadata['target_lang']}")
-        if 'source_lang' in metadata:
-            self.speech_processor.set_source_language(metadata["source_lang"])
-            LOGGER.debug(
-                f"Client {self.client_id} source language set to: {metadata['source_lang']}")
-        if 'metrics_metadata' in metadata:
-            METRICS_LOGGER.info(json.dumps({
-                "id": self.client_id,
-                "metadata": metadata["metrics_metadata"]
-            }))
-            LOGGER.debug(
-                f"Logged client {self.client_id} metrics metadata: {metadata['metrics_metadata']}")
+        for key, value in metadata.items():
+            # a single lookup per key, instead of checking all the supported keys
+            handler = self._METADATA_HANDLERS.get(key)
+            if handler is not None:
+                handler(self, value)
+
+    def _set_sample_rate(self, sample_rate):
+        sample_rate = int(sample_rate)
+        if sample_rate == self.sample_rate:
+            # the resampler is kept, as it holds back the last samples received
+            return
+        # the audio received at the previous sample rate, including the samples held back by its
+        # resampler, is processed together with the next chunk
+        self.processed_audio_seconds += len(self.client_buffer) / 2 / self.sample_rate
+        self._pending_waveform = self._buffered_waveform(last=True)
+        self.sample_rate = sample_rate
+        self._resampler = None
+
+    def _set_target_language(self, language: str):
+        self.speech_processor.set_target_language(language)
+        LOGGER.debug(f"Client {self.client_id} target language set to: {language}")
+
+    def _set_source_language(self, language: str):
+        self.speech_processor.set_source_language(language)
+        LOGGER.debug(f"Client {self.client_id} source language set to: {language}")
+
+    def _log_metrics_metadata(self, metrics_metadata):
+        self._log_metrics({
+            "id": self.client_id,
+            "metadata": metrics_metadata
+        })
+        LOGGER.debug(f"Logged client {self.client_id} metrics metadata: {metrics_metadata}")
+
+    _METADATA_HANDLERS = {
+        'sample_rate': _set_sample_rate,
+        'target_lang': _set_target_language,
+        'source_lang': _set_source_language,
+        'metrics_metadata': _log_metrics_metadata,
+    }
+
+    @staticmethod
+    def _log_metrics(record: dict):
+        # avoid serializing the record when the metrics logging is disabled
+        if METRICS_LOGGER.isEnabledFor(logging.INFO):
+            METRICS_LOGGER.info(json_dumps(record).decode("utf-8"))
 
     def end_of_stream(self) -> IncrementalOutput:
         """
@@ -127,22 +196,23 @@ class MessageProcessor:
         """
         outputs = []
         start_time = time.time()
-        if self.client_buffer:
-            # process remaining audio after last chunk
+        if self.client_buffer or self._resampler is not None or len(self._pending_waveform) > 0:
+            # process remaining audio after last chunk (and the samples held by the resampler)
             self.processed_audio_seconds += len(self.client_buffer) / 2 / self.sample_rate
-            outputs.append(self._run_speech_processor())
+            outputs.append(self._run_speech_processor(last=True))
 
-        outputs.append(self.speech_processor.end_of_stream())
+        with self._inference_lock:
+            outputs.append(self.speech_processor.end_of_stream())
         incremental_output = merge_incremental_outputs(
             outputs, self.speech_processor.tokens_to_string)
         end_time = time.time()
-        METRICS_LOGGER.info(json.dumps({
+        self._log_metrics({
             "id": self.client_id,
             "total_audio_processed": self.processed_audio_seconds,
             "computation_time": end_time - start_time,
             "generated_tokens": incremental_output.new_tokens,
             "deleted_tokens": incremental_output.deleted_tokens,
-        }))
+        })
         self.clear()
         return incremental_output
 
@@ -151,6 +221,8 @@ class MessageProcessor:
         Clear the internal states to be ready for a new input stream.
         """
         self.speech_processor.clear()
-        self.client_buffer = b''
+        self.client_buffer.clear()
         self.processed_audio_seconds = 0
         self.sample_rate = SAMPLE_RATE
+        self._resampler = None
+        self._pending_waveform = np.empty(0, dtype=np.float32)
@@ -13,9 +13,12 @@
 # limitations under the License
 
 import importlib
+import os
+import sys
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from types import SimpleNamespace
-from typing import List, Any
+from typing import List, Any, Optional
 
 import numpy as np
 
@@ -148,6 +151,33 @@ def build_speech_processor(speech_processor_config: SimpleNamespace) -> SpeechPr
     return cls(speech_processor_config)
 
 
+def build_speech_processors(
+        speech_processor_config: SimpleNamespace, num_processors: int) -> List[SpeechProcessor]:
+    """
+    Instantiate multiple speech processors with the same configuration.
+
+    The first speech processor is built alone, so that the models loaded by
+    :meth:`SpeechProcessor.load_model` and shared by all the instances are loaded only once. The
+    other ones are created in parallel threads, which speeds up the creation of the speech
+    processors that load (part of) their models in their constructor, such as
+    :class:`~simulstream.server.speech_processors.simuleval_wrapper.SimulEvalWrapper`.
+
+    Args:
+        speech_processor_config (SimpleNamespace): Configuration for the speech processors.
+        num_processors (int): Number of speech processors to create.
+
+    Returns:
+        List[SpeechProcessor]: The created speech processors.
+    """
+    speech_processors = [build_speech_processor(speech_processor_config)]
+    if num_processors > 1:
+        cls = type(speech_processors[0])
+        with ThreadPoolExecutor(max_workers=num_processors - 1) as executor:
+            speech_processors.extend(executor.map(
+                lambda _: cls(speech_processor_config), range(num_processors - 1)))
+    return speech_processors
+
+
 def speech_processor_class_load(speech_processor_class_string: str) -> type[SpeechProcessor]:
     """
     Import the speech processor class from its string definition.
@@ -167,6 +197,26 @@ def speech_processor_class_load(speech_processor_class_string: str) -> type[Spee
     return cls
 
 
+def set_jit_cache_dir(cache_dir: Optional[str]) -> None:
+    """
+    Set the directory where the kernels compiled with `numba <https://numba.pydata.org/>`_ by the
+    speech processors are cached, so that they are compiled only once across server restarts. By
+    default, they are cached next to the source files, which may not be writable (e.g. in
+    containers). This is equivalent to setting the ``NUMBA_CACHE_DIR`` environment variable, and
+    should be invoked before building the speech processors.
+
+    Args:
+        cache_dir (Optional[str]): Path to the cache directory. If ``None``, nothing is changed.
+    """
+    if cache_dir is None:
+        return
+    os.environ["NUMBA_CACHE_DIR"] = cache_dir
+    if "numba" in sys.modules:
+        # numba reads the environment variables only when imported, unless explicitly reloaded
+        from numba.core import config
+        config.reload_config()
+
+
 def class_load(class_string: str) -> type[Any]:
     module_path, class_name = class_string.rsplit('.', 1)
     module = importlib.import_module(module_path)
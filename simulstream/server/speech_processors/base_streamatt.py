@@ -18,7 +18,8 @@ import numpy as np
 
 from types import SimpleNamespace
 from abc import abstractmethod
-from typing import List, Tuple
+from functools import lru_cache
+from typing import List, Sequence, Tuple
 
 from simulstream.server.speech_processors import class_load
 from simulstream.server.speech_processors.base import BaseSpeechProcessor
@@ -26,6 +27,8 @@ from simulstream.server.speech_processors.incremental_output import IncrementalO
 
 
 BOW_PREFIX = "\u2581"
+# character that never occurs in the tokens, used to join them in a single string
+TOKEN_SEPARATOR = "\0"
 
 
 logger = logging.getLogger(__name__)
@@ -305,26 +308,45 @@ class PunctuationTextHistory:
     The current implementation supports only SentencePiece.
     """
 
-    STRONG_PUNCTUATION = [".", "!", "?", ":", ";", "。"]
+    # all the strong punctuation marks are single characters, so a token contains one of them if
+    # any of its characters is in the set
+    STRONG_PUNCTUATION = frozenset([".", "!", "?", ":", ";", "。"])
+    # the last tokens are scanned one by one, as the last strong punctuation is usually among
+    # them, while the rest of long histories (e.g., without punctuation) is searched at once
+    LONG_HISTORY_SCAN_LEN = 256
 
     def __init__(self, config: SimpleNamespace):
         self.config = config
+        # the same history is selected again whenever no new tokens are generated for a chunk,
+        # so where the retained history starts is cached by the content of the history
+        self._retained_history_start = lru_cache(maxsize=1024)(self._find_retained_history_start)
 
-    def select_text_history(self, text_history):
-        new_history = []
-        seen_punctuation = False
-
-        for token in reversed(text_history):
-            prefix_token = token
-            contains_punctuation = False
-            for punct in self.STRONG_PUNCTUATION:
-                if punct in prefix_token:
-                    contains_punctuation = True
-                    break
-            if contains_punctuation:
-                if seen_punctuation:
-                    break
-            seen_punctuation = True
-            new_history.append(token)
-        # Reverse the list
-        return new_history[::-1]
+    def select_text_history(self, text_history: Sequence[str]) -> Sequence[str]:
+        """
+        Returns the part of the history to retain, as a sequence of the same type as the input
+        one (e.g., a list or a tuple), which is not modified.
+        """
+        return text_history[self._retained_history_start(tuple(text_history)):]
+
+    def _find_retained_history_start(self, text_history: Tuple[str, ...]) -> int:
+        # the last token is always retained, together with all the tokens after the last strong
+        # punctuation that precedes it
+        last_index = len(text_history) - 2
+        stop_index = max(last_index - self.LONG_HISTORY_SCAN_LEN, -1)
+        for i in range(last_index, stop_index, -1):
+            if not self.STRONG_PUNCTUATION.isdisjoint(text_history[i]):
+                return i + 1
+        if stop_index < 0:
+            return 0
+        return self._last_strong_punctuation_index(text_history[:stop_index + 1]) + 1
+
+    def _last_strong_punctuation_index(self, tokens: Tuple[str, ...]) -> int:
+        """
+        Returns the index of the last token containing a strong punctuation character (-1 if
+        none), searching all the tokens at once with string operations implemented in C.
+        """
+        joined_tokens = TOKEN_SEPARATOR.join(tokens)
+        position = max(joined_tokens.rfind(punct) for punct in self.STRONG_PUNCTUATION)
+        if position < 0:
+            return -1
+        return joined_tokens.count(TOKEN_SEPARATOR, 0, position)
@@ -58,13 +58,9 @@ class CanarySlidingWindowRetranslator(SlidingWindowRetranslator):
         history. Returns the concatenated audio history and new frames, taking the last
         `self.window_len` frames, and returns it after storing it in the audio history.
         """
-        if self.audio_history is not None:
-            waveform = np.concatenate((self.audio_history, waveform))
-        new_speech_len = len(waveform)
-        if new_speech_len > self.window_len:
-            waveform = waveform[-self.window_len:]
-        self.audio_history = waveform
-        return torch.tensor(waveform).to(self.device)
+        waveform = self._append_to_audio_history(waveform)
+        # the tensor shares the memory of the audio history, which is copied only to the device
+        return torch.from_numpy(waveform).to(self.device)
 
     def set_target_language(self, language: str) -> None:
         self.tgt_lang_tag = language
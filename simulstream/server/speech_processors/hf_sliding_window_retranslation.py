@@ -12,21 +12,233 @@
 # See the License for the specific language governing permissions and
 # limitations under the License
 
+import logging
+import os
+import queue
+import threading
+import time
 from types import SimpleNamespace
-from typing import List
+from typing import List, Optional, Tuple
 
 import numpy as np
 import torch
-from transformers import AutoProcessor, AutoModelForSpeechSeq2Seq
+from transformers import AutoProcessor, AutoModelForSpeechSeq2Seq, BitsAndBytesConfig, \
+    WhisperFeatureExtractor
+from transformers.modeling_outputs import BaseModelOutput
 
 from simulstream.server.speech_processors import SAMPLE_RATE
 from simulstream.server.speech_processors.sliding_window_retranslation import \
     SlidingWindowRetranslator
 
 
+PRECISIONS = {
+    "fp32": torch.float32,
+    "fp16": torch.float16,
+    "bf16": torch.bfloat16,
+}
+
+
+QUANTIZATIONS = {
+    "int8": lambda dtype: BitsAndBytesConfig(load_in_8bit=True),
+    "nf4": lambda dtype: BitsAndBytesConfig(
+        load_in_4bit=True, bnb_4bit_quant_type="nf4", bnb_4bit_compute_dtype=dtype),
+}
+
+
+logger = logging.getLogger(__name__)
+
+
+class WhisperLogMelSpectrogram:
+    """
+    Computes the same log-mel spectrogram features as :class:`WhisperFeatureExtractor` (with
+    default arguments) directly on the given device. Unlike the feature extractor, the STFT window
+    and the mel filters are created on the device only once, and the features are not moved back
+    to the CPU.
+
+    Args:
+        feature_extractor (WhisperFeatureExtractor): The feature extractor to replicate.
+        device (torch.device): The device where the features are computed.
+    """
+    def __init__(self, feature_extractor: WhisperFeatureExtractor, device: torch.device):
+        self.device = device
+        self.n_samples = feature_extractor.n_samples
+        self.n_fft = feature_extractor.n_fft
+        self.hop_length = feature_extractor.hop_length
+        self.window = torch.hann_window(self.n_fft, device=device)
+        self.mel_filters = torch.from_numpy(feature_extractor.mel_filters.T).to(
+            device, dtype=torch.float32)
+
+    def __call__(self, waveform: np.float32) -> torch.Tensor:
+        # as the feature extractor, the waveform is truncated or zero-padded to n_samples
+        waveform = torch.from_numpy(waveform[:self.n_samples]).to(self.device)
+        padded_waveform = torch.nn.functional.pad(waveform, (0, self.n_samples - len(waveform)))
+        stft = torch.stft(
+            padded_waveform, self.n_fft, self.hop_length, window=self.window, return_complex=True)
+        # the element-wise operations are done in place, to avoid allocating a new tensor for
+        # each of them
+        magnitudes = stft[..., :-1].abs().square_()
+        log_spec = (self.mel_filters @ magnitudes).clamp_(min=1e-10).log10_()
+        log_spec = log_spec.clamp_(min=log_spec.max() - 8.0)
+        return log_spec.add_(4.0).div_(4.0).unsqueeze(0)
+
+
+class CUDAGraphEncoder:
+    """
+    Runs the encoder of a model by replaying a CUDA graph captured for inputs with a fixed shape,
+    which removes the overhead of launching its kernels one by one.
+
+    Args:
+        model: The (encoder-decoder) model on GPU.
+        input_shape (Tuple[int, ...]): The shape of the inputs of the encoder.
+        num_warmup_steps (int): Number of encoder runs before capturing the graph.
+    """
+    def __init__(self, model, input_shape: Tuple[int, ...], num_warmup_steps: int = 3):
+        encoder = model.get_encoder()
+        self.static_input = torch.zeros(input_shape, dtype=model.dtype, device=model.device)
+        with torch.inference_mode():
+            # warm up on a side stream, as required before the capture
+            stream = torch.cuda.Stream()
+            stream.wait_stream(torch.cuda.current_stream())
+            with torch.cuda.stream(stream):
+                for _ in range(num_warmup_steps):
+                    encoder(self.static_input)
+            torch.cuda.current_stream().wait_stream(stream)
+            self.graph = torch.cuda.CUDAGraph()
+            with torch.cuda.graph(self.graph):
+                self.static_output = encoder(self.static_input).last_hidden_state
+        # the static input and output are shared by all the sessions
+        self._lock = threading.Lock()
+
+    def __call__(self, features: torch.Tensor) -> BaseModelOutput:
+        with self._lock:
+            self.static_input.copy_(features)
+            self.graph.replay()
+            return BaseModelOutput(last_hidden_state=self.static_output.clone())
+
+
+class _GenerationRequest:
+    def __init__(self, features: torch.Tensor, generate_kwargs: dict):
+        self.features = features
+        self.generate_kwargs = generate_kwargs
+        # requests can be batched together only if they have the same shape and arguments
+        self.key = (tuple(features.shape[1:]), tuple(sorted(
+            (name, value.item() if isinstance(value, torch.Tensor) else value)
+            for name, value in generate_kwargs.items())))
+        self.done = threading.Event()
+        self.output: Optional[torch.Tensor] = None
+        self.error: Optional[BaseException] = None
+
+
+class GenerationBatcher:
+    """
+    Batches the generations requested concurrently by different threads (i.e., by the speech
+    processors serving different clients), so that the model runs on a batch of inputs instead
+    of once for each of them. The generations are run by a background thread, which batches the
+    requests waiting in the queue, up to ``max_batch_size``, waiting at most ``max_wait`` seconds
+    for further requests after the first one. Only requests with inputs of the same shape and the
+    same generation arguments are batched together.
+
+    Args:
+        model: The model to use for the generation.
+        max_batch_size (int): Maximum number of requests in a batch.
+        max_wait (float): Maximum time (in seconds) to wait for requests to add to a batch.
+    """
+    def __init__(self, model, max_batch_size: int, max_wait: float = 0.0):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._requests = None
+        self._thread = None
+        self._thread_pid = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        # the background thread is started by the first generation in each process, as threads
+        # do not survive fork (e.g., in the worker processes of the WebSocket server)
+        if self._thread_pid != os.getpid():
+            with self._start_lock:
+                if self._thread_pid != os.getpid():
+                    self._requests = queue.Queue()
+                    self._thread = threading.Thread(target=self._run, daemon=True)
+                    self._thread.start()
+                    self._thread_pid = os.getpid()
+
+    def generate(self, features: torch.Tensor, **generate_kwargs) -> torch.Tensor:
+        """
+        Generates the output for the given input features, which contain a single input.
+
+        Returns:
+            torch.Tensor: the generated ids.
+        """
+        self._ensure_started()
+        request = _GenerationRequest(features, generate_kwargs)
+        self._requests.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.output
+
+    def _next_requests(self) -> List[_GenerationRequest]:
+        requests = [self._requests.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(requests) < self.max_batch_size:
+            try:
+                requests.append(self._requests.get(timeout=max(deadline - time.monotonic(), 0)))
+            except queue.Empty:
+                break
+        return requests
+
+    def _run(self):
+        while True:
+            batches = {}
+            for request in self._next_requests():
+                batches.setdefault(request.key, []).append(request)
+            for batch in batches.values():
+                try:
+                    with torch.inference_mode():
+                        generated_ids = self.model.generate(
+                            torch.cat([request.features for request in batch]),
+                            **batch[0].generate_kwargs)
+                    for request, output in zip(batch, generated_ids):
+                        request.output = output
+                except BaseException as e:
+                    for request in batch:
+                        request.error = e
+                for request in batch:
+                    request.done.set()
+
+
 class HFSlidingWindowRetranslator(SlidingWindowRetranslator):
     """
     Perform Sliding Window Retranslation with a Huggingface speech-to-text model.
+
+    Besides the options of :class:`SlidingWindowRetranslator`, the configuration supports:
+
+       - **precision (str, optional)**: Floating point precision of the model weights and
+         computation on GPU, one of ``fp32``, ``fp16``, and ``bf16``. On CPU, the model always
+         runs in ``fp32``. Default = ``fp32``.
+       - **quantization (str, optional)**: Weight-only quantization of the model on GPU with
+         `bitsandbytes <https://github.com/bitsandbytes-foundation/bitsandbytes>`_ (which has to
+         be installed), either ``int8`` or ``nf4``. The modules that are not quantized, as well
+         as the computation of ``nf4`` layers, use the configured **precision**. On CPU, only
+         ``int8`` is supported, which applies PyTorch dynamic quantization to the linear layers.
+         Default = ``None`` (no quantization).
+       - **max_batch_size (int, optional)**: Maximum number of generations requested at the same
+         time by different sessions that are batched together (see :class:`GenerationBatcher`).
+         Default = ``1`` (no batching).
+       - **batch_max_wait (float, optional)**: Maximum time (in seconds) a generation waits for
+         others to batch with. Default = ``0``, i.e., only the generations that are already
+         waiting are batched.
+       - **num_beams (int, optional)**: Number of beams of the beam search. Default = ``None``,
+         i.e., the default of the generation configuration of the model is used.
+       - **cuda_graph (bool, optional)**: Whether to run the encoder with a CUDA graph (see
+         :class:`CUDAGraphEncoder`). It is supported only on GPU for Whisper models, whose
+         inputs have a fixed shape, and it is not used for batched generations. Default =
+         ``False``.
+       - **compile (bool, optional)**: Whether to compile the encoder of the model with
+         :func:`torch.compile`. The compilation happens at the first generations and it is
+         effective when the encoder inputs have always the same shape, as for Whisper models.
+         Ignored if **cuda_graph** is enabled. Default = ``False``.
     """
 
     @classmethod
@@ -39,20 +251,89 @@ class HFSlidingWindowRetranslator(SlidingWindowRetranslator):
             cls.processor = AutoProcessor.from_pretrained(
                 config.hf_model_name,
                 additional_special_tokens=lang_tags)
-            cls.model = AutoModelForSpeechSeq2Seq.from_pretrained(
-                config.hf_model_name, trust_remote_code=True)
+            # the tokenizer recomputes the special ids for each token when skipping them
+            cls.special_ids = frozenset(cls.processor.tokenizer.all_special_ids)
             cls.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-            cls.model.to(cls.device)
+            cls.log_mel_spectrogram = None
+            if isinstance(cls.processor.feature_extractor, WhisperFeatureExtractor):
+                cls.log_mel_spectrogram = WhisperLogMelSpectrogram(
+                    cls.processor.feature_extractor, cls.device)
+            precision = getattr(config, "precision", "fp32")
+            assert precision in PRECISIONS, \
+                f"Unsupported precision {precision}, choose among {list(PRECISIONS.keys())}"
+            if cls.device.type != "cuda" and precision != "fp32":
+                logger.warning(f"Precision {precision} is not supported on CPU, using fp32")
+                precision = "fp32"
+            quantization = getattr(config, "quantization", None)
+            assert quantization is None or quantization in QUANTIZATIONS, \
+                f"Unsupported quantization {quantization}, choose among " \
+                f"{list(QUANTIZATIONS.keys())}"
+            if cls.device.type != "cuda" and quantization not in (None, "int8"):
+                logger.warning(f"Quantization {quantization} is not supported on CPU, ignoring it")
+                quantization = None
+            if quantization is not None and cls.device.type == "cuda":
+                cls.model = AutoModelForSpeechSeq2Seq.from_pretrained(
+                    config.hf_model_name,
+                    trust_remote_code=True,
+                    torch_dtype=PRECISIONS[precision],
+                    quantization_config=QUANTIZATIONS[quantization](PRECISIONS[precision]),
+                    device_map=cls.device)
+            else:
+                cls.model = AutoModelForSpeechSeq2Seq.from_pretrained(
+                    config.hf_model_name,
+                    trust_remote_code=True,
+                    torch_dtype=PRECISIONS[precision])
+                cls.model.to(cls.device)
+                if quantization == "int8":
+                    cls.model = torch.ao.quantization.quantize_dynamic(
+                        cls.model, {torch.nn.Linear}, dtype=torch.qint8)
+            cls.cuda_graph_encoder = None
+            if getattr(config, "cuda_graph", False):
+                if cls.device.type != "cuda" or cls.log_mel_spectrogram is None:
+                    logger.warning("CUDA graphs are supported only on GPU for Whisper models")
+                else:
+                    feature_extractor = cls.processor.feature_extractor
+                    cls.cuda_graph_encoder = CUDAGraphEncoder(
+                        cls.model,
+                        (1, feature_extractor.feature_size, feature_extractor.nb_max_frames))
+            if getattr(config, "compile", False):
+                if cls.cuda_graph_encoder is not None:
+                    logger.warning("The encoder runs with a CUDA graph, so it is not compiled")
+                else:
+                    # the decoder is not compiled, as its input shapes change at every step
+                    encoder = cls.model.get_encoder()
+                    encoder.forward = torch.compile(encoder.forward)
+            cls.batcher = None
+            max_batch_size = getattr(config, "max_batch_size", 1)
+            if max_batch_size > 1:
+                cls.batcher = GenerationBatcher(
+                    cls.model, max_batch_size, getattr(config, "batch_max_wait", 0.0))
+
+    def __init__(self, config: SimpleNamespace):
+        super().__init__(config)
+        self.num_beams = getattr(self.config, "num_beams", None)
 
     def _generate(self, speech: torch.Tensor) -> List[str]:
-        speech_seconds = speech.shape[1] / 100  # 1 frame every 10 ms
+        # the features may be padded (e.g., to 30 seconds by Whisper feature extractors), so the
+        # maximum number of tokens is based on the length of the actual audio
+        speech_seconds = len(self.audio_history) / SAMPLE_RATE
         extra_kwargs = {
             "max_new_tokens": int(max(self.max_tokens_per_second * speech_seconds, 10))}
+        if self.num_beams is not None:
+            extra_kwargs["num_beams"] = self.num_beams
         if self.tgt_lang_tag is not None:
             extra_kwargs["forced_bos_token_id"] = self.tgt_lang_tag
-        generated_ids = self.model.generate(speech, **extra_kwargs)[0]
+        if self.batcher is not None:
+            generated_ids = self.batcher.generate(speech, **extra_kwargs)
+        else:
+            with torch.inference_mode():
+                if self.cuda_graph_encoder is not None:
+                    generated_ids = self.model.generate(
+                        encoder_outputs=self.cuda_graph_encoder(speech), **extra_kwargs)[0]
+                else:
+                    generated_ids = self.model.generate(speech, **extra_kwargs)[0]
         return self.processor.tokenizer.convert_ids_to_tokens(
-            generated_ids, skip_special_tokens=True)
+            [token_id for token_id in generated_ids.tolist() if token_id not in self.special_ids])
 
     def tokens_to_string(self, tokens: List[str]) -> str:
         # avoid that the initial space, if it is there, get removed in the detokenization
@@ -65,18 +346,18 @@ class HFSlidingWindowRetranslator(SlidingWindowRetranslator):
         Extracts the filter-bank features from the input waveform and appends them to the audio
         history. Returns the concatenated audio history and new frames, taking the last
         `self.window_len` frames, and returns it after storing it in the audio history.
+
+        The features of Whisper models are computed directly on the model device.
         """
-        if self.audio_history is not None:
-            waveform = np.concatenate((self.audio_history, waveform))
-        new_speech_len = len(waveform)
-        if new_speech_len > self.window_len:
-            waveform = waveform[-self.window_len:]
-        self.audio_history = waveform
-        new_speech = self.processor(
-            waveform,
-            sampling_rate=SAMPLE_RATE,
-            return_tensors="pt")["input_features"]
-        return new_speech.to(self.device)
+        waveform = self._append_to_audio_history(waveform)
+        if self.log_mel_spectrogram is not None:
+            new_speech = self.log_mel_spectrogram(waveform)
+        else:
+            new_speech = self.processor(
+                waveform,
+                sampling_rate=SAMPLE_RATE,
+                return_tensors="pt")["input_features"]
+        return new_speech.to(self.device, dtype=self.model.dtype)
 
     def set_target_language(self, language: str) -> None:
         lang_tag_id = self.processor.tokenizer.convert_tokens_to_ids(
@@ -16,6 +16,8 @@ import json
 from dataclasses import dataclass
 from typing import List, Callable
 
+from simulstream.server.json_utils import json_dumps
+
 
 @dataclass
 class IncrementalOutput:
@@ -43,6 +45,16 @@ class IncrementalOutput:
         """
         return json.dumps({"new": self.new_string, "deleted": self.deleted_string})
 
+    def strings_to_json_bytes(self) -> bytes:
+        """
+        Serialize the incremental output to UTF-8 encoded JSON, which can be sent as it is over
+        the network without further encoding.
+
+        Returns:
+            bytes: The UTF-8 encoded JSON containing the newly generated and the deleted text.
+        """
+        return json_dumps({"new": self.new_string, "deleted": self.deleted_string})
+
 
 def merge_incremental_outputs(
         outputs: List[IncrementalOutput],
@@ -12,15 +12,17 @@
 # See the License for the specific language governing permissions and
 # limitations under the License
 
-import base64
-import json
+import http.client
+import select
+import struct
 from http import HTTPStatus
 from typing import List, Any, Dict, Optional
 import uuid
-import urllib.request
+import urllib.error
 
 import numpy as np
 
+from simulstream.server.json_utils import json_dumps, json_loads
 from simulstream.server.speech_processors import SpeechProcessor, IncrementalOutput
 
 
@@ -34,6 +36,8 @@ class HttpProxySpeechProcessor(SpeechProcessor):
 
     Each instance of this class corresponds to exactly one remote session.
     """
+    # requests that can be repeated without changing their effect on the remote session
+    IDEMPOTENT_METHODS = {"GET", "PUT"}
 
     @classmethod
     def load_model(cls, config):
@@ -42,22 +46,69 @@ class HttpProxySpeechProcessor(SpeechProcessor):
     def __init__(self, config):
         super().__init__(config)
         self.base_url = f"http://{config.hostname}:{config.port}/"
+        self._connection = http.client.HTTPConnection(config.hostname, config.port)
         self.session_id = uuid.uuid4().hex
-        self._cached_speech_chunk_size = None
+        # retrieved once here, as it is needed before the first chunk can be processed: fetching
+        # it lazily would add a round trip to the server at the beginning of the stream
+        self._speech_chunk_size = self._http_request("speech_chunk_size", "GET", {
+            "session_id": self.session_id
+        })["speech_chunk_size"]
 
     def _http_request(
             self, path: str, method: str, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        data = json.dumps(payload).encode("utf-8")
-        req = urllib.request.Request(
-            self.base_url + path,
-            data=data,
-            headers={"Content-Type": "application/json"},
-            method=method,
-        )
-        with urllib.request.urlopen(req) as resp:
-            if resp.status == HTTPStatus.NO_CONTENT:
-                return None
-            return json.loads(resp.read())
+        return self._send_request(
+            path, method, json_dumps(payload), {"Content-Type": "application/json"})
+
+    def _http_request_binary(self, path: str, body: bytes) -> Optional[Dict[str, Any]]:
+        """
+        Sends the raw bytes as the body of a POST request, so that (large) binary payloads as
+        audio waveforms do not need to be encoded into JSON. The session is identified by the
+        ``X-Session-Id`` header.
+        """
+        return self._send_request(path, "POST", body, {
+            "Content-Type": "application/octet-stream",
+            "X-Session-Id": self.session_id,
+        })
+
+    def _send_request(
+            self,
+            path: str,
+            method: str,
+            body: bytes,
+            headers: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        """
+        Sends the request over the persistent (keep-alive) connection to the server, so that
+        consecutive chunks do not pay the connection setup. If a reused connection has been
+        dropped by the server in the meantime, the request is sent again on a new connection,
+        unless it may have been already processed by the server and is not idempotent.
+        """
+        sock = self._connection.sock
+        # an idle connection becomes readable only when the server closes it, as no response is
+        # pending, so it is replaced before sending the request rather than retrying it later
+        if sock is not None and select.select([sock], [], [], 0)[0]:
+            self._connection.close()
+        reused_connection = self._connection.sock is not None
+        request_sent = False
+        try:
+            self._connection.request(method, "/" + path, body=body, headers=headers)
+            request_sent = True
+            response = self._connection.getresponse()
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            self._connection.close()
+            # once sent, the request may have been processed even if its response has been lost,
+            # so sending it again could repeat its effects (e.g. processing a chunk twice)
+            if not reused_connection or (
+                    request_sent and method not in self.IDEMPOTENT_METHODS):
+                raise
+            self._connection.request(method, "/" + path, body=body, headers=headers)
+            response = self._connection.getresponse()
+        data = response.read()
+        if response.status >= HTTPStatus.BAD_REQUEST:
+            raise urllib.error.HTTPError(
+                self.base_url + path, response.status, response.reason, response.headers, None)
+        if response.status == HTTPStatus.NO_CONTENT:
+            return None
+        return json_loads(data)
 
     @staticmethod
     def _to_incremental_outputs(json_dict: Dict[str, Any]):
@@ -70,20 +121,36 @@ class HttpProxySpeechProcessor(SpeechProcessor):
 
     @property
     def speech_chunk_size(self) -> float:
-        if self._cached_speech_chunk_size is None:
-            response = self._http_request("speech_chunk_size", "GET", {
-                "session_id": self.session_id
-            })
-            self._cached_speech_chunk_size = response["speech_chunk_size"]
-        return self._cached_speech_chunk_size
+        return self._speech_chunk_size
 
     def process_chunk(self, waveform: np.float32) -> IncrementalOutput:
-        response = self._http_request("process_chunk", "POST", {
-            "session_id": self.session_id,
-            "waveform": base64.b64encode(waveform.tobytes()).decode("utf-8"),
-        })
+        # the memoryview exposes the float32 samples as raw bytes without copying them
+        waveform = np.ascontiguousarray(waveform, dtype=np.float32)
+        response = self._http_request_binary("process_chunk", memoryview(waveform).cast("B"))
         return self._to_incremental_outputs(response)
 
+    def process_chunks(self, waveforms: List[np.float32]) -> List[IncrementalOutput]:
+        """
+        Process multiple consecutive chunks of waveform with a single request to the server,
+        which is equivalent to calling :meth:`process_chunk` on each of them in order. It is meant
+        for callers that have several chunks ready at once (e.g. when processing recorded audio),
+        as the :class:`~simulstream.server.message_processor.MessageProcessor` sends each
+        buffered waveform as a single chunk.
+
+        Args:
+            waveforms (List[np.float32]): The chunks of audio to process, in cronological order.
+
+        Returns:
+            List[IncrementalOutput]: The incremental outputs corresponding to each chunk.
+        """
+        body = bytearray(struct.pack("<I", len(waveforms)))
+        for waveform in waveforms:
+            waveform = np.ascontiguousarray(waveform, dtype=np.float32)
+            body += struct.pack("<I", len(waveform))
+            body += memoryview(waveform).cast("B")
+        response = self._http_request_binary("process_chunk_batch", body)
+        return [self._to_incremental_outputs(output) for output in response["outputs"]]
+
     def set_source_language(self, language):
         self._http_request("source_language", "PUT", {
             "session_id": self.session_id,
@@ -13,23 +13,27 @@
 # limitations under the License
 
 import argparse
-import base64
-import json
+import asyncio
+import binascii
 import time
 import logging
+import struct
+from concurrent.futures import ThreadPoolExecutor
 from functools import partial
 from http import HTTPStatus
-from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from queue import Queue
 import threading
 from types import SimpleNamespace
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Callable, Awaitable, List
 
 import numpy as np
+from aiohttp import web, WSCloseCode, WSMsgType
 
 import simulstream
 from simulstream.config import yaml_config
-from simulstream.server.speech_processors import build_speech_processor, SpeechProcessor
+from simulstream.server.json_utils import json_dumps, json_loads
+from simulstream.server.speech_processors import build_speech_processors, SpeechProcessor, \
+    IncrementalOutput, set_jit_cache_dir
 
 
 logging.basicConfig(
@@ -55,8 +59,12 @@ class SpeechProcessorSessionManager:
         self.size = size
         self.ttl = ttl
         self.available = Queue(maxsize=size)
-        for _ in range(size):
-            self.available.put_nowait(build_speech_processor(speech_processor_config))
+        speech_processors = build_speech_processors(speech_processor_config, size)
+        # all the speech processors share the same configuration, so clients can retrieve the
+        # chunk size without being allocated a speech processor
+        self.speech_chunk_size = speech_processors[0].speech_chunk_size
+        for speech_processor in speech_processors:
+            self.available.put_nowait(speech_processor)
 
         # starting cleanup loop
         self._cleanup_stop_event = threading.Event()
@@ -67,18 +75,23 @@ class SpeechProcessorSessionManager:
         self._cleanup_thread.start()
 
     def get(self, session_id) -> SpeechProcessor:
+        # fast path for already allocated sessions: single dict reads and writes are atomic,
+        # so the lock is needed only to allocate a new session
+        speech_processor = self._sessions.get(session_id)
+        if speech_processor is not None:
+            self._last_access[session_id] = time.monotonic()
+            return speech_processor
         with self._lock:
             if session_id not in self._sessions:
                 self._sessions[session_id] = self.available.get_nowait()
                 LOGGER.info(
                     f"Speech processor allocated to {session_id}, speech processors available: "
                     f"{self.available.qsize()}")
-            self._last_access[session_id] = time.time()
+            self._last_access[session_id] = time.monotonic()
             return self._sessions[session_id]
 
     def is_active(self, session_id) -> bool:
-        with self._lock:
-            return session_id in self._sessions
+        return session_id in self._sessions
 
     def close_session(self, session_id):
         with self._lock:
@@ -93,15 +106,17 @@ class SpeechProcessorSessionManager:
                 self._last_access.pop(session_id)
 
     def _cleanup(self):
-        while not self._cleanup_stop_event.is_set():
-            time.sleep(self.ttl)
-            now = time.time()
-            expired = []
+        # waiting on the event, instead of sleeping, lets shutdown() return immediately
+        while not self._cleanup_stop_event.wait(self.ttl):
+            if not self._last_access:
+                continue
+            now = time.monotonic()
             with self._lock:
-                for session_id in self._sessions.keys():
-                    if session_id not in self._last_access or \
-                            now - self._last_access[session_id] > self.ttl:
-                        expired.append(session_id)
+                # get() updates the last access times without holding the lock, so we iterate
+                # over a copy of them (done atomically) to avoid concurrent modifications
+                expired = [
+                    session_id for session_id, last_access in list(self._last_access.items())
+                    if now - last_access > self.ttl]
 
             for session_id in expired:
                 self.close_session(session_id)
@@ -111,87 +126,196 @@ class SpeechProcessorSessionManager:
         self._cleanup_thread.join()
 
 
-class HttpSpeechProcessorHandler(BaseHTTPRequestHandler):
-    def __init__(
-            self, *args, speech_processor_manager: SpeechProcessorSessionManager = None, **kwargs):
+class HttpSpeechProcessorHandler:
+    """
+    Exposes the speech processors of a :class:`SpeechProcessorSessionManager` over HTTP.
+
+    Requests are served by an asyncio event loop, so that idle (keep-alive) connections do not
+    hold a thread each, while the calls to the speech processors, which are CPU/GPU bound, run in
+    a pool with as many threads as the speech processors.
+
+    Args:
+        speech_processor_manager (SpeechProcessorSessionManager): The manager of the speech
+            processors to expose.
+    """
+    # maximum size (in bytes) of request bodies, which may contain several chunks of audio
+    CLIENT_MAX_SIZE = 256 * 1024 ** 2
+
+    def __init__(self, speech_processor_manager: SpeechProcessorSessionManager):
         self.speech_processor_manager = speech_processor_manager
-        super().__init__(*args, **kwargs)
-
-    def _read_json(self) -> dict:
-        length = int(self.headers.get("Content-Length", "0"))
-        data = self.rfile.read(length)
-        return json.loads(data)
-
-    def _send_json_response(self, code: int, message: Optional[Dict[str, Any]] = None):
-        self.send_response(code)
-        self.send_header("Content-type", "application/json; charset=utf-8")
-        self.end_headers()
-        if message is not None:
-            self.wfile.write(json.dumps(message).encode("utf-8"))
-        else:
-            self.wfile.write("".encode("utf-8"))
-
-    def do_GET(self):
-        function_handler = getattr(self, "get_" + self.path.strip("/"))
-        function_handler(**self._read_json())
-
-    def do_POST(self):
-        function_handler = getattr(self, "post_" + self.path.strip("/"))
-        function_handler(**self._read_json())
-
-    def do_PUT(self):
-        function_handler = getattr(self, "put_" + self.path.strip("/"))
-        function_handler(**self._read_json())
-
-    def get_speech_chunk_size(self, session_id):
-        processor = self.speech_processor_manager.get(session_id)
-        self._send_json_response(HTTPStatus.OK, {"speech_chunk_size": processor.speech_chunk_size})
+        self._executor = ThreadPoolExecutor(max_workers=speech_processor_manager.size)
+        # function handlers by HTTP method and path, shared by the HTTP and WebSocket requests
+        self._routes = {
+            ("GET", "speech_chunk_size"): self.get_speech_chunk_size,
+            ("POST", "process_chunk"): self.post_process_chunk,
+            ("POST", "process_chunk_batch"): self.post_process_chunk_batch,
+            ("PUT", "source_language"): self.put_source_language,
+            ("PUT", "target_language"): self.put_target_language,
+            ("POST", "end_of_stream"): self.post_end_of_stream,
+            ("POST", "clear"): self.post_clear,
+            ("GET", "tokens_to_string"): self.get_tokens_to_string,
+        }
+
+    def build_app(self) -> web.Application:
+        app = web.Application(client_max_size=self.CLIENT_MAX_SIZE)
+        app.add_routes([
+            web.route(method, "/" + path, self._route(function_handler))
+            for (method, path), function_handler in self._routes.items()
+        ])
+        app.add_routes([web.get("/ws/{session_id}", self.handle_websocket)])
+        return app
 
-    def post_process_chunk(self, session_id, waveform):
-        processor = self.speech_processor_manager.get(session_id)
-        output = processor.process_chunk(
-            np.frombuffer(base64.b64decode(waveform), dtype=np.float32))
-        self._send_json_response(HTTPStatus.OK, {
+    def shutdown(self) -> None:
+        self._executor.shutdown()
+
+    def _route(
+            self,
+            function_handler: Callable[..., Optional[Dict[str, Any]]]
+    ) -> Callable[[web.Request], Awaitable[web.Response]]:
+        """
+        Wraps a function handler, which receives the arguments of the request and returns the
+        JSON message to send back (if any), into an aiohttp request handler that runs it in the
+        thread pool.
+        """
+        async def handle(request: web.Request) -> web.Response:
+            body = await request.read()
+            if request.headers.get("Content-Type") == "application/octet-stream":
+                # binary payloads carry raw float32 waveform(s), the session is in the headers
+                handler_call = partial(function_handler, request.headers["X-Session-Id"], body)
+            else:
+                # requests without arguments may have an empty body
+                handler_call = partial(function_handler, **(json_loads(body) if body else {}))
+            message = await asyncio.get_running_loop().run_in_executor(
+                self._executor, handler_call)
+            if message is None:
+                return web.Response(status=HTTPStatus.NO_CONTENT)
+            return web.Response(
+                body=json_dumps(message), content_type="application/json", charset="utf-8")
+        return handle
+
+    async def handle_websocket(self, request: web.Request) -> web.WebSocketResponse:
+        """
+        Serves a session over a WebSocket connection, which avoids the per-request overhead of
+        HTTP for streams of audio chunks. A speech processor is allocated to the session when the
+        connection is opened and released when it is closed.
+
+        Binary messages contain a chunk of float32 audio to process, while text messages are JSON
+        objects with the ``method`` and ``path`` of the equivalent HTTP request together with its
+        arguments (except the session id). Each message is answered, in order, with a binary
+        message containing the JSON response of the equivalent HTTP request (``null`` for the
+        requests without content).
+        """
+        session_id = request.match_info["session_id"]
+        self.speech_processor_manager.get(session_id)
+        websocket = web.WebSocketResponse(max_msg_size=self.CLIENT_MAX_SIZE)
+        await websocket.prepare(request)
+        loop = asyncio.get_running_loop()
+        try:
+            async for message in websocket:
+                if message.type == WSMsgType.BINARY:
+                    handler_call = partial(self.post_process_chunk, session_id, message.data)
+                elif message.type == WSMsgType.TEXT:
+                    kwargs = json_loads(message.data)
+                    function_handler = self._routes[(kwargs.pop("method"), kwargs.pop("path"))]
+                    handler_call = partial(function_handler, session_id, **kwargs)
+                else:
+                    break
+                response = await loop.run_in_executor(self._executor, handler_call)
+                await websocket.send_bytes(json_dumps(response))
+        except Exception as e:
+            LOGGER.exception(f"Error serving session {session_id} over WebSocket: {e}")
+            await websocket.close(code=WSCloseCode.INTERNAL_ERROR)
+        finally:
+            await loop.run_in_executor(self._executor, self.post_clear, session_id)
+        return websocket
+
+    @staticmethod
+    def _incremental_output_to_dict(output: IncrementalOutput) -> Dict[str, Any]:
+        return {
             "new_tokens": output.new_tokens,
             "new_string": output.new_string,
             "deleted_tokens": output.deleted_tokens,
             "deleted_string": output.deleted_string,
-        })
+        }
+
+    def get_speech_chunk_size(self, session_id=None):
+        return {"speech_chunk_size": self.speech_processor_manager.speech_chunk_size}
+
+    def post_process_chunk(self, session_id, waveform):
+        if isinstance(waveform, str):
+            # JSON requests carry the waveform as base64-encoded float32 bytes. Unlike
+            # base64.b64decode, binascii decodes the string without copying it to bytes first
+            waveform = binascii.a2b_base64(waveform)
+        processor = self.speech_processor_manager.get(session_id)
+        output = processor.process_chunk(np.frombuffer(waveform, dtype=np.float32))
+        return self._incremental_output_to_dict(output)
+
+    def post_process_chunk_batch(self, session_id, waveforms):
+        """
+        Processes in order multiple chunks sent in a single binary request. The body contains
+        the number of chunks followed, for each of them, by its number of samples and the
+        float32 samples themselves (all integers are unsigned 32-bit little endian).
+        """
+        waveforms = self._parse_chunk_batch(waveforms)
+        processor = self.speech_processor_manager.get(session_id)
+        return {"outputs": [
+            self._incremental_output_to_dict(processor.process_chunk(waveform))
+            for waveform in waveforms]}
+
+    @staticmethod
+    def _parse_chunk_batch(body: bytes) -> List[np.ndarray]:
+        """
+        Splits the body of a ``process_chunk_batch`` request into its chunks, without copying
+        them. The whole body is validated before any chunk is processed, so that malformed
+        requests are rejected (with a 400 status) without altering the state of the session.
+        """
+        if len(body) < 4:
+            raise web.HTTPBadRequest(text="Missing number of chunks")
+        num_waveforms, = struct.unpack_from("<I", body, 0)
+        offset = 4
+        waveforms = []
+        for i in range(num_waveforms):
+            if len(body) < offset + 4:
+                raise web.HTTPBadRequest(text=f"Missing number of samples of chunk {i}")
+            num_samples, = struct.unpack_from("<I", body, offset)
+            offset += 4
+            if len(body) < offset + num_samples * 4:
+                raise web.HTTPBadRequest(text=f"Truncated samples of chunk {i}")
+            waveforms.append(
+                np.frombuffer(body, dtype=np.float32, count=num_samples, offset=offset))
+            offset += num_samples * 4
+        if offset != len(body):
+            raise web.HTTPBadRequest(
+                text=f"{len(body) - offset} unexpected bytes after {num_waveforms} chunks")
+        return waveforms
 
     def put_source_language(self, session_id, language):
         processor = self.speech_processor_manager.get(session_id)
         processor.set_source_language(language)
-        self._send_json_response(HTTPStatus.NO_CONTENT)
 
     def put_target_language(self, session_id, language):
         processor = self.speech_processor_manager.get(session_id)
         processor.set_target_language(language)
-        self._send_json_response(HTTPStatus.NO_CONTENT)
 
     def post_end_of_stream(self, session_id):
         processor = self.speech_processor_manager.get(session_id)
         output = processor.end_of_stream()
-        self._send_json_response(HTTPStatus.OK, {
-            "new_tokens": output.new_tokens,
-            "new_string": output.new_string,
-            "deleted_tokens": output.deleted_tokens,
-            "deleted_string": output.deleted_string,
-        })
+        return self._incremental_output_to_dict(output)
 
     def post_clear(self, session_id):
         if self.speech_processor_manager.is_active(session_id):
             self.speech_processor_manager.close_session(session_id)
-        self._send_json_response(HTTPStatus.NO_CONTENT)
 
     def get_tokens_to_string(self, session_id, tokens):
         processor = self.speech_processor_manager.get(session_id)
         output = processor.tokens_to_string(tokens)
-        self._send_json_response(HTTPStatus.OK, {"tokens_as_string": output})
+        return {"tokens_as_string": output}
 
 
 def serve(args: argparse.Namespace):
     LOGGER.info(f"Loading server configuration from {args.server_config}")
     server_config = yaml_config(args.server_config)
+    set_jit_cache_dir(getattr(server_config, "numba_cache_dir", None))
     LOGGER.info(f"Loading speech processor from {args.speech_processor_config}")
     speech_processor_loading_time = time.time()
     speech_processor_session_manager = SpeechProcessorSessionManager(
@@ -200,12 +324,14 @@ def serve(args: argparse.Namespace):
     speech_processor_loading_time = time.time() - speech_processor_loading_time
     LOGGER.info(f"Loaded speech processor in {speech_processor_loading_time:.3f} seconds")
 
-    custom_handler = partial(
-        HttpSpeechProcessorHandler, speech_processor_manager=speech_processor_session_manager)
-    httpd = ThreadingHTTPServer((server_config.hostname, server_config.port), custom_handler)
+    handler = HttpSpeechProcessorHandler(speech_processor_session_manager)
     LOGGER.info(f"Serving on http://{server_config.hostname}:{server_config.port}")
-    httpd.serve_forever()
-    speech_processor_session_manager.shutdown()
+    try:
+        web.run_app(
+            handler.build_app(), host=server_config.hostname, port=server_config.port, print=None)
+    finally:
+        handler.shutdown()
+        speech_processor_session_manager.shutdown()
 
 
 def main():
@@ -0,0 +1,94 @@
+# Copyright 2026 FBK
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+from typing import List, Any, Union
+import uuid
+
+import numpy as np
+from websockets.sync.client import connect, ClientConnection
+
+from simulstream.server.json_utils import json_dumps, json_loads
+from simulstream.server.speech_processors import IncrementalOutput
+from simulstream.server.speech_processors.remote.http_proxy_speech_processor import \
+    HttpProxySpeechProcessor
+
+
+class WebSocketProxySpeechProcessor(HttpProxySpeechProcessor):
+    """
+    WebSocket-based proxy implementation of :class:`SpeechProcessor`.
+
+    Like :class:`HttpProxySpeechProcessor`, it forwards all method calls to a remote speech
+    processor exposed by the HTTP speech processor server, but the requests of its session are
+    exchanged over a WebSocket connection, so that each chunk of audio is sent as a single binary
+    frame without the overhead of an HTTP request.
+
+    The connection is opened with the first request of the session and closed by :meth:`clear`,
+    which releases the remote speech processor.
+    """
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.websocket_url = f"ws://{config.hostname}:{config.port}/ws/"
+        self._websocket = None
+
+    def _get_websocket(self) -> ClientConnection:
+        if self._websocket is None:
+            # audio is not compressible enough to be worth the cost of compressing it
+            self._websocket = connect(
+                self.websocket_url + self.session_id, compression=None, max_size=None)
+        return self._websocket
+
+    def _websocket_request(self, message: Union[bytes, memoryview, str]) -> Any:
+        websocket = self._get_websocket()
+        websocket.send(message)
+        return json_loads(websocket.recv())
+
+    def _json_request(self, method: str, path: str, **kwargs) -> Any:
+        return self._websocket_request(
+            json_dumps({"method": method, "path": path, **kwargs}).decode("utf-8"))
+
+    def process_chunk(self, waveform: np.float32) -> IncrementalOutput:
+        # the memoryview exposes the float32 samples as raw bytes without copying them
+        waveform = np.ascontiguousarray(waveform, dtype=np.float32)
+        return self._to_incremental_outputs(
+            self._websocket_request(memoryview(waveform).cast("B")))
+
+    def process_chunks(self, waveforms: List[np.float32]) -> List[IncrementalOutput]:
+        # the server answers the messages in order, so all the chunks are sent before waiting
+        # for the outputs, which saves a round trip for each chunk but the first one
+        websocket = self._get_websocket()
+        for waveform in waveforms:
+            waveform = np.ascontiguousarray(waveform, dtype=np.float32)
+            websocket.send(memoryview(waveform).cast("B"))
+        return [self._to_incremental_outputs(json_loads(websocket.recv())) for _ in waveforms]
+
+    def set_source_language(self, language):
+        self._json_request("PUT", "source_language", language=language)
+
+    def set_target_language(self, language):
+        self._json_request("PUT", "target_language", language=language)
+
+    def end_of_stream(self) -> IncrementalOutput:
+        return self._to_incremental_outputs(self._json_request("POST", "end_of_stream"))
+
+    def clear(self):
+        if self._websocket is not None:
+            self._websocket.close()
+            self._websocket = None
+            # the server releases the previous session asynchronously, so a new session is used
+            # to avoid that its release affects the next requests
+            self.session_id = uuid.uuid4().hex
+
+    def tokens_to_string(self, tokens: List[str]) -> str:
+        return self._json_request("GET", "tokens_to_string", tokens=tokens)["tokens_as_string"]
@@ -33,6 +33,8 @@ class SeamlessSlidingWindowRetranslator(SlidingWindowRetranslator):
     def load_model(cls, config: SimpleNamespace):
         if not hasattr(cls, "model") or cls.model is None:
             cls.processor = AutoProcessor.from_pretrained(config.hf_model_name)
+            # the tokenizer recomputes the special ids for each token when skipping them
+            cls.special_ids = frozenset(cls.processor.tokenizer.all_special_ids)
             seamless_version = getattr(config, "seamless_version", 1)
             if seamless_version == 2:
                 cls.model = SeamlessM4Tv2Model.from_pretrained(config.hf_model_name)
@@ -50,8 +52,9 @@ class SeamlessSlidingWindowRetranslator(SlidingWindowRetranslator):
         if self.tgt_lang_tag is not None:
             extra_kwargs["tgt_lang"] = self.tgt_lang_tag
         generated_ids = self.model.generate(input_features=speech, **extra_kwargs)[0]
-        return self.processor.tokenizer.convert_ids_to_tokens(
-            generated_ids.squeeze(), skip_special_tokens=True)
+        return self.processor.tokenizer.convert_ids_to_tokens([
+            token_id for token_id in generated_ids.flatten().tolist()
+            if token_id not in self.special_ids])
 
     def tokens_to_string(self, tokens: List[str]) -> str:
         # avoid that the initial space, if it is there, get removed in the detokenization
@@ -65,12 +68,7 @@ class SeamlessSlidingWindowRetranslator(SlidingWindowRetranslator):
         history. Returns the concatenated audio history and new frames, taking the last
         `self.window_len` frames, and returns it after storing it in the audio history.
         """
-        if self.audio_history is not None:
-            waveform = np.concatenate((self.audio_history, waveform))
-        new_speech_len = len(waveform)
-        if new_speech_len > self.window_len:
-            waveform = waveform[-self.window_len:]
-        self.audio_history = waveform
+        waveform = self._append_to_audio_history(waveform)
         new_speech = self.processor(
             audios=waveform,
             sampling_rate=SAMPLE_RATE,
@@ -61,6 +61,9 @@ class SeamlessStreamAtt(BaseStreamAtt):
         self.audio_history_max_duration = getattr(self.config, "audio_history_max_duration", 360)
         self.no_repeat_ngram_size = getattr(self.config, "no_repeat_ngram_size", 5)
         self.waveform_accumulator = None
+        # buffer containing the audio history, which ends at `self._features_end`
+        self._features_buffer = None
+        self._features_end = 0
 
     @property
     def audio_max_len(self) -> float:
@@ -79,6 +82,8 @@ class SeamlessStreamAtt(BaseStreamAtt):
     def load_model(cls, config: SimpleNamespace):
         if not hasattr(cls, "model") or cls.model is None:
             cls.processor = AutoProcessor.from_pretrained(config.hf_model_name)
+            # the tokenizer recomputes the special ids for each token when skipping them
+            cls.special_ids = frozenset(cls.processor.tokenizer.all_special_ids)
             seamless_version = getattr(config, "seamless_version", 1)
             if seamless_version == 2:
                 cls.model = SeamlessM4Tv2Model.from_pretrained(config.hf_model_name)
@@ -97,7 +102,34 @@ class SeamlessStreamAtt(BaseStreamAtt):
         mu = np.expand_dims(features.mean(axis=0), 0)
         sigma = np.sqrt(np.expand_dims(features.var(axis=0, ddof=1), 0) + 1e-7)
         normalized = (features - mu) / sigma
-        return torch.tensor(np.array(normalized))
+        return torch.from_numpy(normalized)
+
+    def _append_to_audio_history(self, new_features: np.ndarray) -> None:
+        """
+        Appends the new features to the audio history. The features are copied into a buffer
+        with spare capacity, so that the whole history is not copied at every chunk. The audio
+        history is a view over the buffer that always ends at `self._features_end`, as the
+        history is only cut at the beginning (see :meth:`_update_speech_history`). When the
+        buffer is full, the history is moved at its beginning, or into a new buffer twice as
+        large as the history if it does not fit.
+        """
+        history_len = len(self.audio_history) if self.audio_history is not None else 0
+        new_history_len = history_len + len(new_features)
+        if self._features_buffer is None or \
+                self._features_end + len(new_features) > len(self._features_buffer):
+            features_buffer = self._features_buffer
+            if features_buffer is None or new_history_len > len(features_buffer) // 2:
+                features_buffer = np.empty(
+                    (2 * new_history_len, new_features.shape[1]), dtype=new_features.dtype)
+            if history_len > 0:
+                features_buffer[:history_len] = self.audio_history
+            self._features_buffer = features_buffer
+            self._features_end = history_len
+        self._features_buffer[self._features_end:self._features_end + len(new_features)] = \
+            new_features
+        self._features_end += len(new_features)
+        self.audio_history = self._features_buffer[
+            self._features_end - new_history_len:self._features_end]
 
     def _preprocess(self, waveform: np.ndarray) -> torch.Tensor:
         """
@@ -129,10 +161,7 @@ class SeamlessStreamAtt(BaseStreamAtt):
             )["input_features"].squeeze(0)  # shape: (T_new, 160)
 
             # Concatenate with previous features, if available
-            if self.audio_history is not None:
-                self.audio_history = np.concatenate((self.audio_history, new_features), axis=0)
-            else:
-                self.audio_history = new_features
+            self._append_to_audio_history(new_features)
 
         # Normalize all features
         normalized_features = self.mean_variance_normalization(self.audio_history)
@@ -179,7 +208,7 @@ class SeamlessStreamAtt(BaseStreamAtt):
             output_attentions=True,
             no_repeat_ngram_size=self.no_repeat_ngram_size,
             generate_speech=False)
-        out_ids = list(gen_out.sequences[0])
+        out_ids = gen_out.sequences[0].tolist()
 
         # Exclude BOS, prefix, and EOS from the generated sequence
         new_hypo_ids = out_ids[prefix_ids.shape[1] + 1:-1]
@@ -193,7 +222,7 @@ class SeamlessStreamAtt(BaseStreamAtt):
             f"({(prefix_ids.shape[1] - 1) + len(new_hypo_ids)})."
 
         new_hypo = self.processor.tokenizer.convert_ids_to_tokens(
-            new_hypo_ids, skip_special_tokens=True)
+            [token_id for token_id in new_hypo_ids if token_id not in self.special_ids])
         return new_hypo, cross_attn
 
     def _extract_new_hypo_attention_scores(self, new_hypo_len: int, gen_out):
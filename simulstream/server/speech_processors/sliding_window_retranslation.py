@@ -12,17 +12,72 @@
 # See the License for the specific language governing permissions and
 # limitations under the License
 
-from difflib import SequenceMatcher
+import logging
+from difflib import Match
 from types import SimpleNamespace
 from typing import List
 
+import numpy as np
 import torch
+from numba import njit
 
 from simulstream.server.speech_processors import SAMPLE_RATE
 from simulstream.server.speech_processors.base import BaseSpeechProcessor
 from simulstream.server.speech_processors.incremental_output import IncrementalOutput
 
 
+logger = logging.getLogger(__name__)
+
+
+@njit(cache=True)
+def _longest_common_substring(a: np.ndarray, b: np.ndarray):
+    """
+    Dynamic programming search of the longest common substring between the two integer arrays,
+    keeping only the previous row of the matrix of the lengths of the common suffixes.
+    Ties are resolved in favor of the match that starts first in ``a`` and then in ``b``.
+    """
+    best_a, best_b, best_size = 0, 0, 0
+    previous = np.zeros(len(b) + 1, dtype=np.int64)
+    current = np.zeros(len(b) + 1, dtype=np.int64)
+    for i in range(len(a)):
+        for j in range(len(b)):
+            if a[i] == b[j]:
+                size = previous[j] + 1
+                current[j + 1] = size
+                if size > best_size:
+                    best_a, best_b, best_size = i - size + 1, j - size + 1, size
+            else:
+                current[j + 1] = 0
+        previous, current = current, previous
+    return best_a, best_b, best_size
+
+
+def longest_match(a: List[str], b: List[str]) -> Match:
+    """
+    Find the longest matching block of tokens between the two lists. This is equivalent to
+    ``SequenceMatcher(None, a, b, autojunk=False).find_longest_match()``, but it runs a compiled
+    kernel over the token indexes instead of the pure-Python matching over the tokens.
+
+    Args:
+        a (List[str]): The first list of tokens.
+        b (List[str]): The second list of tokens.
+
+    Returns:
+        Match: the start of the matching block in ``a`` and ``b`` and its size.
+    """
+    token_ids = {}
+    a_ids = np.array([token_ids.setdefault(token, len(token_ids)) for token in a], dtype=np.int64)
+    b_ids = np.array([token_ids.setdefault(token, len(token_ids)) for token in b], dtype=np.int64)
+    return Match(*_longest_common_substring(a_ids, b_ids))
+
+
+# compile the kernel at import time, so that the first processed chunk does not pay for it
+try:
+    longest_match(["warmup"], ["warmup"])
+except Exception as e:
+    logger.warning(f"Failed to compile the longest match kernel at import time: {e}")
+
+
 class SlidingWindowRetranslator(BaseSpeechProcessor):
     """
     A speech processor that applies a fixed-length sliding window retranslation with
@@ -57,6 +112,29 @@ class SlidingWindowRetranslator(BaseSpeechProcessor):
         self.override_on_failed_match = getattr(self.config, "override_on_failed_match", False)
         self.max_tokens_per_second = getattr(self.config, "max_tokens_per_second", 10)
         self.within_first_window = True
+        # preallocated storage of the audio history, which is a view over its first samples
+        self._audio_buffer = np.zeros(self.window_len, dtype=np.float32)
+
+    def _append_to_audio_history(self, waveform: np.float32) -> np.float32:
+        """
+        Appends the new waveform to the audio history, keeping only the last `self.window_len`
+        samples. The samples are copied in place into a preallocated buffer, so that no new
+        array is allocated for each chunk.
+
+        Returns:
+            np.float32: the updated audio history, which is a view over the internal buffer.
+        """
+        if len(waveform) >= self.window_len:
+            self._audio_buffer[:] = waveform[-self.window_len:]
+            self.audio_history = self._audio_buffer
+            return self.audio_history
+        history_len = len(self.audio_history) if self.audio_history is not None else 0
+        kept_len = min(history_len, self.window_len - len(waveform))
+        if 0 < kept_len < history_len:
+            self._audio_buffer[:kept_len] = self._audio_buffer[history_len - kept_len:history_len]
+        self._audio_buffer[kept_len:kept_len + len(waveform)] = waveform
+        self.audio_history = self._audio_buffer[:kept_len + len(waveform)]
+        return self.audio_history
 
     def _build_incremental_outputs(self, generated_tokens: List[str]) -> IncrementalOutput:
         """
@@ -77,19 +155,20 @@ class SlidingWindowRetranslator(BaseSpeechProcessor):
                 deleted_tokens=[],
                 deleted_string=""
             )
-        seq_matcher = SequenceMatcher(None, self.text_history, generated_tokens, autojunk=False)
-        longest_match = seq_matcher.find_longest_match()
-        if longest_match.size >= self.matching_threshold * len(generated_tokens):
-            new_tokens = generated_tokens[longest_match.b + longest_match.size:]
-            deleted_tokens = self.text_history[longest_match.a + longest_match.size:]
-            new_string = self.tokens_to_string(new_tokens)
-            deleted_string = self.tokens_to_string(deleted_tokens)
+        match = longest_match(self.text_history, generated_tokens)
+        if match.size >= self.matching_threshold * len(generated_tokens):
+            new_tokens = generated_tokens[match.b + match.size:]
+            deleted_tokens = self.text_history[match.a + match.size:]
+            # when the windows are aligned, often no token is deleted and/or added, so we avoid
+            # calling the detokenizer on empty lists
+            new_string = self.tokens_to_string(new_tokens) if new_tokens else ""
+            deleted_string = self.tokens_to_string(deleted_tokens) if deleted_tokens else ""
             # we take the matching part and the last part of the generated string as part of
             # the history. Then we take from the history the tokens corresponding to the amount
             # generated in this step, to ensure we have a sufficiently wide window
-            matching_and_last_tokens = generated_tokens[longest_match.b:]
+            matching_and_last_tokens = generated_tokens[match.b:]
             initial_discarded_tokens = len(generated_tokens) - len(matching_and_last_tokens)
-            history_tokens_discarded = self.text_history[longest_match.a:]
+            history_tokens_discarded = self.text_history[match.a:]
             history_initial_tokens = len(self.text_history) - len(history_tokens_discarded)
             new_history_initial_tokens = self.text_history[
                 max(history_initial_tokens - initial_discarded_tokens, 0):history_initial_tokens]
@@ -15,20 +15,25 @@
 import argparse
 import asyncio
 import logging
+import multiprocessing
+import threading
 import time
 from contextlib import asynccontextmanager
 from types import SimpleNamespace
-from typing import Callable, Awaitable
+from typing import Callable, Awaitable, Optional
 
+import torch
 import websockets
 from websockets.asyncio.server import serve, ServerConnection
-import json
 
 import simulstream
 from simulstream.config import yaml_config
-from simulstream.metrics.logger import setup_metrics_logger, METRICS_LOGGER
+from simulstream.metrics.logger import setup_metrics_logger, shutdown_metrics_logger, \
+    METRICS_LOGGER
+from simulstream.server.json_utils import json_dumps, json_loads
 from simulstream.server.message_processor import MessageProcessor
-from simulstream.server.speech_processors import build_speech_processor
+from simulstream.server.speech_processors import build_speech_processors, set_jit_cache_dir, \
+    speech_processor_class_load
 
 
 logging.basicConfig(
@@ -37,6 +42,10 @@ logging.basicConfig(
     level=logging.INFO,
 )
 LOGGER = logging.getLogger('simulstream.websocket_server')
+# the messages are serialized to UTF-8 and sent as text frames without further encoding
+END_OF_PROCESSING_MESSAGE = json_dumps({'end_of_processing': True})
+DEFAULT_MAX_MESSAGE_SIZE = 2 ** 20
+DEFAULT_MAX_QUEUED_MESSAGES = 16
 
 
 class SpeechProcessorPool:
@@ -58,8 +67,8 @@ class SpeechProcessorPool:
         self.size = size
         self.acquire_timeout = acquire_timeout
         self.available = asyncio.Queue(maxsize=size)
-        for _ in range(size):
-            self.available.put_nowait(build_speech_processor(speech_processor_config))
+        for speech_processor in build_speech_processors(speech_processor_config, size):
+            self.available.put_nowait(speech_processor)
 
     @asynccontextmanager
     async def acquire(self):
@@ -82,7 +91,8 @@ class SpeechProcessorPool:
 
 
 def connection_handler_factory(
-        speech_processor_pool: SpeechProcessorPool
+        speech_processor_pool: SpeechProcessorPool,
+        inference_lock: Optional[threading.Semaphore] = None
 ) -> Callable[[ServerConnection], Awaitable[None]]:
     """
     Factory function that creates a connection handler for the WebSocket server.
@@ -99,6 +109,9 @@ def connection_handler_factory(
     Args:
         speech_processor_pool (SpeechProcessorPool): Pool of speech processors to use to handle
             client connections.
+        inference_lock (threading.Semaphore, optional): Lock shared by all the connections to
+            limit how many speech processors run at the same time. The speech processors run in
+            a thread pool, so that the event loop is not blocked in any case.
 
     Returns:
         Callable[[websockets.asyncio.server.ServerConnection], Awaitable[None]]: An asynchronous
@@ -132,7 +145,8 @@ def connection_handler_factory(
         LOGGER.info(f"Client {client_id} connected")
         try:
             async with speech_processor_pool.acquire() as speech_processor:
-                message_processor = MessageProcessor(client_id, speech_processor)
+                message_processor = MessageProcessor(
+                    client_id, speech_processor, inference_lock=inference_lock)
 
                 try:
                     async for message in websocket:
@@ -141,16 +155,18 @@ def connection_handler_factory(
                             incremental_output = await loop.run_in_executor(
                                 None, message_processor.process_speech, message)
                             if incremental_output is not None:
-                                await websocket.send(incremental_output.strings_to_json())
+                                await websocket.send(
+                                    incremental_output.strings_to_json_bytes(), text=True)
                         elif isinstance(message, str):
                             # textual message are used to handle metadata
                             try:
-                                data = json.loads(message)
+                                data = json_loads(message)
                                 if 'end_of_stream' in data:
                                     incremental_output = await loop.run_in_executor(
                                         None, message_processor.end_of_stream)
-                                    await websocket.send(incremental_output.strings_to_json())
-                                    await websocket.send(json.dumps({'end_of_processing': True}))
+                                    await websocket.send(
+                                        incremental_output.strings_to_json_bytes(), text=True)
+                                    await websocket.send(END_OF_PROCESSING_MESSAGE, text=True)
                                 else:
                                     message_processor.process_metadata(data)
                             except Exception as e:
@@ -169,13 +185,113 @@ def connection_handler_factory(
     return handle_connection
 
 
-async def main(args: argparse.Namespace):
+async def serve_speech_processors(
+        server_config: SimpleNamespace,
+        speech_processor_config: SimpleNamespace,
+        reuse_port: bool = False):
+    """
+    Creates the pool of speech processors and serves the clients with them over WebSocket.
+
+    The memory used by each client is bounded by the ``max_message_size`` (in bytes, default 1
+    MiB) and ``max_queued_messages`` (default 16) options of the server configuration: larger
+    messages close the connection, and no more messages are read from clients that have
+    ``max_queued_messages`` messages waiting to be processed, so that clients sending audio faster
+    than it is processed are slowed down.
+
+    Args:
+        server_config (SimpleNamespace): configuration of the server.
+        speech_processor_config (SimpleNamespace): configuration of the speech processors.
+        reuse_port (bool): whether to bind the port with ``SO_REUSEPORT``, so that multiple
+            processes can accept the connections on the same port.
+    """
+    speech_processor_loading_time = time.time()
+    speech_processors_pool = SpeechProcessorPool(
+        speech_processor_config, server_config.pool_size, server_config.acquire_timeout)
+    speech_processor_loading_time = time.time() - speech_processor_loading_time
+    LOGGER.info(f"Loaded speech processor in {speech_processor_loading_time:.3f} seconds")
+    METRICS_LOGGER.info(json_dumps({
+        "model_loading_time": speech_processor_loading_time,
+    }).decode("utf-8"))
+    # optionally limit the number of speech processors running at the same time (e.g., 1 to
+    # serialize the access to a single GPU), while the rest of the processing runs in parallel
+    max_concurrent_inferences = getattr(server_config, "max_concurrent_inferences", None)
+    inference_lock = None
+    if max_concurrent_inferences is not None:
+        inference_lock = threading.BoundedSemaphore(max_concurrent_inferences)
+    # the audio buffered for each client never exceeds a chunk plus one message, as messages are
+    # processed one at a time
+    max_size = getattr(server_config, "max_message_size", DEFAULT_MAX_MESSAGE_SIZE)
+    max_queue = getattr(server_config, "max_queued_messages", DEFAULT_MAX_QUEUED_MESSAGES)
+    LOGGER.info(f"Serving websocket server at {server_config.hostname}:{server_config.port}")
+    async with serve(
+            connection_handler_factory(speech_processors_pool, inference_lock),
+            server_config.hostname,
+            server_config.port,
+            ping_timeout=None,
+            max_size=max_size,
+            max_queue=max_queue,
+            reuse_port=reuse_port) as server:
+        await server.serve_forever()
+
+
+def _serve_worker(server_config: SimpleNamespace, speech_processor_config: SimpleNamespace):
+    try:
+        asyncio.run(
+            serve_speech_processors(server_config, speech_processor_config, reuse_port=True))
+    finally:
+        # worker processes exit without running the atexit handlers
+        shutdown_metrics_logger()
+
+
+def serve_workers(
+        server_config: SimpleNamespace,
+        speech_processor_config: SimpleNamespace,
+        num_workers: int):
+    """
+    Serves the clients with multiple worker processes, each with its own event loop and pool of
+    ``pool_size`` speech processors, which accept the connections on the same port.
+
+    The models are loaded once before forking the workers, so that their weights are shared
+    (copy-on-write) among all the workers instead of being loaded in each of them. As CUDA
+    cannot be used in forked processes, this is supported only for models running on CPU.
+
+    Args:
+        server_config (SimpleNamespace): configuration of the server.
+        speech_processor_config (SimpleNamespace): configuration of the speech processors.
+        num_workers (int): number of worker processes to start.
+    """
+    speech_processor_class_load(speech_processor_config.type).load_model(speech_processor_config)
+    if torch.cuda.is_initialized():
+        raise ValueError(
+            "Multiple workers (num_workers > 1) are supported only for models running on CPU, "
+            "as CUDA cannot be used in forked processes.")
+    LOGGER.info(f"Starting {num_workers} worker processes")
+    context = multiprocessing.get_context("fork")
+    workers = [
+        context.Process(
+            target=_serve_worker,
+            args=(server_config, speech_processor_config),
+            name=f"simulstream-worker-{i}")
+        for i in range(num_workers)]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    finally:
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+
+
+def main(args: argparse.Namespace):
     """
     Main entry point for running the WebSocket speech server.
 
     This function loads the server and speech processor configurations from YAML,
     initializes logging (including metrics logging), and starts the WebSocket server
-    on the configured host and port.
+    on the configured host and port, optionally with multiple worker processes (configured with
+    ``num_workers`` in the server configuration).
 
     Args:
         args (argparse.Namespace): parsed command-line arguments with configuration file paths.
@@ -186,31 +302,22 @@ async def main(args: argparse.Namespace):
         f"Metric logging is{'' if server_config.metrics.enabled else ' NOT'} enabled at "
         f"{server_config.metrics.filename}")
     setup_metrics_logger(server_config.metrics)
+    set_jit_cache_dir(getattr(server_config, "numba_cache_dir", None))
     LOGGER.info(f"Loading speech processor from {args.speech_processor_config}")
     speech_processor_config = yaml_config(args.speech_processor_config)
     LOGGER.info(f"Using as speech processor: {speech_processor_config.type}")
-    speech_processor_loading_time = time.time()
-    speech_processors_pool = SpeechProcessorPool(
-        speech_processor_config, server_config.pool_size, server_config.acquire_timeout)
-    speech_processor_loading_time = time.time() - speech_processor_loading_time
-    LOGGER.info(f"Loaded speech processor in {speech_processor_loading_time:.3f} seconds")
-    METRICS_LOGGER.info(json.dumps({
-        "model_loading_time": speech_processor_loading_time,
-    }))
-    LOGGER.info(f"Serving websocket server at {server_config.hostname}:{server_config.port}")
-    async with serve(
-            connection_handler_factory(speech_processors_pool),
-            server_config.hostname,
-            server_config.port,
-            ping_timeout=None) as server:
-        await server.serve_forever()
+    num_workers = getattr(server_config, "num_workers", 1)
+    if num_workers > 1:
+        serve_workers(server_config, speech_processor_config, num_workers)
+    else:
+        asyncio.run(serve_speech_processors(server_config, speech_processor_config))
 
 
 def cli_main():
     """
     Simulstream WebSocket server command-line interface (CLI) entry point.
 
-    This function parses command-line arguments and starts the asynchronous :func:`main` routine.
+    This function parses command-line arguments and starts the :func:`main` routine.
 
     Example usage::
 
@@ -229,7 +336,7 @@ def cli_main():
     parser.add_argument("--server-config", type=str, default="config/server.yaml")
     parser.add_argument("--speech-processor-config", type=str, required=True)
     args = parser.parse_args()
-    asyncio.run(main(args))
+    main(args)
 
 
 if __name__ == "__main__":
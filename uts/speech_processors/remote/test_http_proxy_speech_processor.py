@@ -0,0 +1,124 @@
+# Copyright 2026 FBK
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+import http.client
+import select
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+from simulstream.server.json_utils import json_dumps
+from simulstream.server.speech_processors.remote.http_proxy_speech_processor import \
+    HttpProxySpeechProcessor
+from uts.speech_processors.remote.utils import BackgroundServer, waveform
+
+
+class TestHttpProxySpeechProcessor(unittest.TestCase):
+    def setUp(self):
+        self.server = BackgroundServer()
+        self.server.__enter__()
+        self.addCleanup(self.server.__exit__, None, None, None)
+
+    def proxy(self):
+        proxy = HttpProxySpeechProcessor(self.server.proxy_config())
+        self.addCleanup(proxy._connection.close)
+        self.addCleanup(proxy.clear)
+        return proxy
+
+    def test_process_chunks(self):
+        """ Test that processing a batch of chunks is equivalent to processing them in order. """
+        chunks = [waveform(100), waveform(0), waveform(30, seed=1)]
+        sequential_proxy = self.proxy()
+        expected = [sequential_proxy.process_chunk(chunk) for chunk in chunks]
+        batch_proxy = self.proxy()
+        self.assertNotEqual(batch_proxy.session_id, sequential_proxy.session_id)
+        self.assertEqual(batch_proxy.process_chunks(chunks), expected)
+        self.assertEqual(batch_proxy.process_chunks([]), [])
+        self.assertEqual(
+            batch_proxy.end_of_stream(), sequential_proxy.end_of_stream())
+
+
+class FlakyRequestHandler(BaseHTTPRequestHandler):
+    """
+    Answers the requests like the speech processor server, but drops the connection without
+    answering the requests to the paths in ``server.dropped_paths`` and closes the connection
+    after answering if ``server.close_after_response`` is set.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def handle_request(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.requests.append((self.command, self.path))
+        if self.path in self.server.dropped_paths:
+            self.close_connection = True
+            return
+        if self.path == "/speech_chunk_size":
+            body = json_dumps({"speech_chunk_size": 0.5})
+        else:
+            body = json_dumps({
+                "new_tokens": [], "new_string": "", "deleted_tokens": [], "deleted_string": ""})
+        # read before answering, as the client may change it as soon as it gets the response
+        self.close_connection = self.server.close_after_response
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_PUT = do_POST = handle_request
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestHttpProxySpeechProcessorReconnection(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyRequestHandler)
+        self.server.requests = []
+        self.server.dropped_paths = set()
+        self.server.close_after_response = False
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.proxy = HttpProxySpeechProcessor(
+            SimpleNamespace(hostname="127.0.0.1", port=self.server.server_address[1]))
+        self.addCleanup(self.proxy._connection.close)
+
+    def test_post_not_repeated(self):
+        """ Test that chunks are not sent again when the connection drops after sending them. """
+        self.server.dropped_paths.add("/process_chunk")
+        with self.assertRaises(http.client.RemoteDisconnected):
+            self.proxy.process_chunk(waveform(10))
+        self.assertEqual(self.server.requests.count(("POST", "/process_chunk")), 1)
+
+    def test_idempotent_request_repeated(self):
+        self.server.dropped_paths.add("/target_language")
+        with self.assertRaises(http.client.RemoteDisconnected):
+            self.proxy.set_target_language("it")
+        # the request is sent again once, on a new connection
+        self.assertEqual(self.server.requests.count(("PUT", "/target_language")), 2)
+
+    def test_closed_connection_replaced(self):
+        """ Test that connections closed by the server while idle are replaced. """
+        self.server.close_after_response = True
+        self.proxy.process_chunk(waveform(10))
+        # waits for the server to close the connection
+        select.select([self.proxy._connection.sock], [], [], 5)
+        self.proxy.process_chunk(waveform(10))
+        self.assertEqual(self.server.requests.count(("POST", "/process_chunk")), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+# Copyright 2026 FBK
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+import base64
+import struct
+import time
+import unittest
+
+from aiohttp.test_utils import AioHTTPTestCase
+
+from simulstream.server.speech_processors.remote.http_speech_processor_server import \
+    HttpSpeechProcessorHandler, SpeechProcessorSessionManager
+from uts.speech_processors.remote.utils import dummy_speech_processor_config, waveform
+
+
+class TestHttpSpeechProcessorServer(AioHTTPTestCase):
+    async def get_application(self):
+        self.manager = SpeechProcessorSessionManager(
+            dummy_speech_processor_config(), size=2, ttl=60)
+        self.handler = HttpSpeechProcessorHandler(self.manager)
+        return self.handler.build_app()
+
+    async def asyncTearDown(self):
+        await super().asyncTearDown()
+        self.handler.shutdown()
+        self.manager.shutdown()
+
+    async def post_chunk(self, session_id, chunk):
+        return await self.post_binary("/process_chunk", session_id, chunk.tobytes())
+
+    async def post_binary(self, path, session_id, body):
+        return await self.client.post(
+            path,
+            data=body,
+            headers={"Content-Type": "application/octet-stream", "X-Session-Id": session_id})
+
+    @staticmethod
+    def chunk_batch(chunks):
+        body = struct.pack("<I", len(chunks))
+        for chunk in chunks:
+            body += struct.pack("<I", len(chunk)) + chunk.tobytes()
+        return body
+
+    async def test_speech_chunk_size(self):
+        response = await self.client.get("/speech_chunk_size")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(await response.json(), {"speech_chunk_size": 0.5})
+        # no speech processor is allocated to retrieve the chunk size
+        self.assertEqual(self.manager.available.qsize(), 2)
+
+    async def test_session(self):
+        response = await self.client.put(
+            "/target_language", json={"session_id": "a", "language": "it"})
+        self.assertEqual(response.status, 204)
+        self.assertEqual(self.manager.get("a").target_language, "it")
+
+        response = await self.post_chunk("a", waveform(100))
+        self.assertEqual(response.status, 200)
+        output = await response.json()
+        self.assertEqual(output["new_tokens"], [f"0:100:{waveform(100).sum():.3f}"])
+        self.assertEqual(output["deleted_tokens"], [])
+
+        # JSON requests carry the waveform encoded in base64
+        response = await self.client.post("/process_chunk", json={
+            "session_id": "a",
+            "waveform": base64.b64encode(waveform(50, seed=1).tobytes()).decode("ascii")})
+        output = await response.json()
+        self.assertEqual(output["new_tokens"], [f"1:50:{waveform(50, seed=1).sum():.3f}"])
+
+        response = await self.client.get(
+            "/tokens_to_string", json={"session_id": "a", "tokens": ["x", "y"]})
+        self.assertEqual(await response.json(), {"tokens_as_string": "x y"})
+
+        response = await self.client.post("/end_of_stream", json={"session_id": "a"})
+        self.assertEqual((await response.json())["new_tokens"], ["<eos>"])
+
+        response = await self.client.post("/clear", json={"session_id": "a"})
+        self.assertEqual(response.status, 204)
+        self.assertFalse(self.manager.is_active("a"))
+        self.assertEqual(self.manager.available.qsize(), 2)
+
+    async def test_sessions_are_independent(self):
+        await self.post_chunk("a", waveform(10))
+        await self.post_chunk("a", waveform(10))
+        output = await (await self.post_chunk("b", waveform(10))).json()
+        self.assertTrue(output["new_tokens"][0].startswith("0:"))
+        self.assertEqual(self.manager.available.qsize(), 0)
+
+    async def test_process_chunk_batch(self):
+        """ Test that a batch of chunks is equivalent to processing them one at a time. """
+        chunks = [waveform(100), waveform(0), waveform(30, seed=1)]
+        expected = [await (await self.post_chunk("a", chunk)).json() for chunk in chunks]
+        response = await self.post_binary("/process_chunk_batch", "b", self.chunk_batch(chunks))
+        self.assertEqual(response.status, 200)
+        self.assertEqual(await response.json(), {"outputs": expected})
+
+        response = await self.post_binary("/process_chunk_batch", "b", self.chunk_batch([]))
+        self.assertEqual(await response.json(), {"outputs": []})
+
+    async def test_malformed_chunk_batch(self):
+        body = self.chunk_batch([waveform(10), waveform(20)])
+        for malformed_body in [
+                b"",
+                body[:2],
+                body[:4],
+                body[:-4],
+                body + b"\x00",
+                struct.pack("<II", 1, 2 ** 32 - 1)]:
+            response = await self.post_binary("/process_chunk_batch", "a", malformed_body)
+            self.assertEqual(response.status, 400)
+        # no chunk of the malformed requests has been processed
+        output = await (await self.post_chunk("a", waveform(10))).json()
+        self.assertTrue(output["new_tokens"][0].startswith("0:"))
+
+    async def test_unknown_route(self):
+        response = await self.client.get("/process_chunk")
+        self.assertEqual(response.status, 405)
+        response = await self.client.get("/unknown")
+        self.assertEqual(response.status, 404)
+
+
+class TestSessionCleanup(unittest.TestCase):
+    def test_idle_session_released(self):
+        """ Test that the speech processors of idle sessions are released after the TTL. """
+        manager = SpeechProcessorSessionManager(dummy_speech_processor_config(), size=1, ttl=0.1)
+        try:
+            speech_processor = manager.get("a")
+            speech_processor.set_target_language("it")
+            deadline = time.monotonic() + 5
+            while manager.is_active("a") and time.monotonic() < deadline:
+                time.sleep(0.05)
+            self.assertFalse(manager.is_active("a"))
+            self.assertEqual(manager.available.qsize(), 1)
+            # the released speech processor has been cleared
+            self.assertIsNone(speech_processor.target_language)
+        finally:
+            manager.shutdown()
+
+    def test_active_session_kept(self):
+        manager = SpeechProcessorSessionManager(dummy_speech_processor_config(), size=1, ttl=0.3)
+        try:
+            for _ in range(8):
+                manager.get("a")
+                time.sleep(0.1)
+            self.assertTrue(manager.is_active("a"))
+        finally:
+            manager.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
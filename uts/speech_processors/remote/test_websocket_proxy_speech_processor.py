@@ -0,0 +1,81 @@
+# Copyright 2026 FBK
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+import time
+import unittest
+
+from aiohttp import WSCloseCode
+from websockets.exceptions import ConnectionClosedError
+
+from simulstream.server.speech_processors.remote.websocket_proxy_speech_processor import \
+    WebSocketProxySpeechProcessor
+from uts.speech_processors.remote.utils import BackgroundServer, waveform
+
+
+class TestWebSocketProxySpeechProcessor(unittest.TestCase):
+    def setUp(self):
+        self.server = BackgroundServer()
+        self.server.__enter__()
+        self.addCleanup(self.server.__exit__, None, None, None)
+        self.proxy = WebSocketProxySpeechProcessor(self.server.proxy_config())
+        self.addCleanup(self.proxy._connection.close)
+        self.addCleanup(self.proxy.clear)
+
+    def wait_released(self, session_id):
+        # the server releases the session asynchronously, when the connection is closed
+        deadline = time.monotonic() + 5
+        while self.server.manager.is_active(session_id) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertFalse(self.server.manager.is_active(session_id))
+
+    def test_round_trip(self):
+        self.assertEqual(self.proxy.speech_chunk_size, 0.5)
+        self.proxy.set_target_language("it")
+        self.assertEqual(self.server.manager.get(self.proxy.session_id).target_language, "it")
+
+        output = self.proxy.process_chunk(waveform(100))
+        self.assertEqual(output.new_tokens, [f"0:100:{waveform(100).sum():.3f}"])
+        self.assertEqual(output.deleted_tokens, [])
+
+        outputs = self.proxy.process_chunks([waveform(10, seed=1), waveform(20, seed=2)])
+        self.assertEqual([output.new_tokens for output in outputs], [
+            [f"1:10:{waveform(10, seed=1).sum():.3f}"],
+            [f"2:20:{waveform(20, seed=2).sum():.3f}"]])
+
+        self.assertEqual(self.proxy.tokens_to_string(["a", "b"]), "a b")
+        self.assertEqual(self.proxy.end_of_stream().new_tokens, ["<eos>"])
+
+    def test_clear(self):
+        """ Test that clear releases the session and that a new one is used afterwards. """
+        self.proxy.process_chunk(waveform(10))
+        session_id = self.proxy.session_id
+        self.proxy.clear()
+        self.assertNotEqual(self.proxy.session_id, session_id)
+        self.wait_released(session_id)
+
+        output = self.proxy.process_chunk(waveform(10))
+        self.assertTrue(output.new_tokens[0].startswith("0:"))
+        self.assertTrue(self.server.manager.is_active(self.proxy.session_id))
+
+    def test_unknown_route(self):
+        """ Test that requests to unknown routes close the connection and release the session. """
+        self.proxy.process_chunk(waveform(10))
+        with self.assertRaises(ConnectionClosedError) as context:
+            self.proxy._json_request("DELETE", "process_chunk")
+        self.assertEqual(context.exception.rcvd.code, WSCloseCode.INTERNAL_ERROR)
+        self.wait_released(self.proxy.session_id)
+
+
+if __name__ == "__main__":
+    unittest.main()
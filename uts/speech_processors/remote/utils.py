@@ -0,0 +1,108 @@
+# Copyright 2026 FBK
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+import asyncio
+import threading
+from types import SimpleNamespace
+from typing import List
+
+import numpy as np
+from aiohttp import web
+
+from simulstream.server.speech_processors import SpeechProcessor, IncrementalOutput
+from simulstream.server.speech_processors.remote.http_speech_processor_server import \
+    HttpSpeechProcessorHandler, SpeechProcessorSessionManager
+
+
+class DummySpeechProcessor(SpeechProcessor):
+    """
+    Generates, for each chunk, a token with the index of the chunk in the stream, its number of
+    samples, and their sum, so that the outputs depend on the chunks and on their order.
+    """
+    @classmethod
+    def load_model(cls, config: SimpleNamespace):
+        pass
+
+    def __init__(self, config: SimpleNamespace):
+        super().__init__(config)
+        self.num_chunks = 0
+        self.source_language = None
+        self.target_language = None
+
+    def process_chunk(self, waveform: np.float32) -> IncrementalOutput:
+        token = f"{self.num_chunks}:{len(waveform)}:{float(np.sum(waveform)):.3f}"
+        self.num_chunks += 1
+        return IncrementalOutput([token], token, [], "")
+
+    def set_source_language(self, language: str) -> None:
+        self.source_language = language
+
+    def set_target_language(self, language: str) -> None:
+        self.target_language = language
+
+    def end_of_stream(self) -> IncrementalOutput:
+        return IncrementalOutput(["<eos>"], "<eos>", [], "")
+
+    def tokens_to_string(self, tokens: List[str]) -> str:
+        return " ".join(tokens)
+
+    def clear(self) -> None:
+        self.num_chunks = 0
+        self.source_language = None
+        self.target_language = None
+
+
+def dummy_speech_processor_config() -> SimpleNamespace:
+    return SimpleNamespace(
+        type=f"{DummySpeechProcessor.__module__}.{DummySpeechProcessor.__name__}",
+        speech_chunk_size=0.5)
+
+
+def waveform(num_samples: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal(num_samples).astype(np.float32)
+
+
+class BackgroundServer:
+    """
+    Runs the HTTP speech processor server with :class:`DummySpeechProcessor` on a free port in a
+    background thread, so that it can be used by the (synchronous) proxy speech processors.
+    """
+    def __init__(self, size: int = 2, ttl: float = 60):
+        self.manager = SpeechProcessorSessionManager(dummy_speech_processor_config(), size, ttl)
+        self.handler = HttpSpeechProcessorHandler(self.manager)
+        self.port = None
+        self._runner = web.AppRunner(self.handler.build_app())
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+
+    async def _start(self):
+        await self._runner.setup()
+        await web.TCPSite(self._runner, "127.0.0.1", 0).start()
+        self.port = self._runner.addresses[0][1]
+
+    def __enter__(self) -> "BackgroundServer":
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+        return self
+
+    def __exit__(self, *exc_info):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self.handler.shutdown()
+        self.manager.shutdown()
+
+    def proxy_config(self) -> SimpleNamespace:
+        return SimpleNamespace(hostname="127.0.0.1", port=self.port)
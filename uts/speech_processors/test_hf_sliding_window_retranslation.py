@@ -0,0 +1,136 @@
+# Copyright 2026 FBK
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+import multiprocessing
+import threading
+import time
+import unittest
+
+import numpy as np
+import torch
+from transformers import WhisperFeatureExtractor
+
+from simulstream.server.speech_processors import SAMPLE_RATE
+from simulstream.server.speech_processors.hf_sliding_window_retranslation import \
+    WhisperLogMelSpectrogram, GenerationBatcher
+
+
+class TestWhisperLogMelSpectrogram(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.feature_extractor = WhisperFeatureExtractor()
+        cls.log_mel_spectrogram = WhisperLogMelSpectrogram(
+            cls.feature_extractor, torch.device("cpu"))
+
+    def assert_same_as_feature_extractor(self, waveform):
+        expected = self.feature_extractor(
+            waveform, sampling_rate=SAMPLE_RATE, return_tensors="pt")["input_features"]
+        features = self.log_mel_spectrogram(waveform)
+        self.assertEqual(features.shape, expected.shape)
+        torch.testing.assert_close(features, expected, atol=1e-4, rtol=1e-4)
+
+    def test_short_waveform(self):
+        rng = np.random.default_rng(42)
+        self.assert_same_as_feature_extractor(
+            rng.uniform(-0.5, 0.5, 3 * SAMPLE_RATE).astype(np.float32))
+
+    def test_long_waveform(self):
+        """ Test that waveforms longer than 30 seconds are truncated. """
+        rng = np.random.default_rng(42)
+        self.assert_same_as_feature_extractor(
+            rng.uniform(-0.5, 0.5, 31 * SAMPLE_RATE).astype(np.float32))
+
+
+class DummyModel:
+    """ Returns as generated ids the first feature of each input, repeated 3 times. """
+    def __init__(self):
+        self.batch_sizes = []
+
+    def generate(self, features, max_new_tokens=3):
+        self.batch_sizes.append(len(features))
+        time.sleep(0.05)
+        if (features < 0).any():
+            raise ValueError("negative features")
+        return features[:, :1].long().repeat(1, max_new_tokens)
+
+
+class TestGenerationBatcher(unittest.TestCase):
+    def run_concurrently(self, batcher, inputs):
+        outputs = [None] * len(inputs)
+
+        def generate(i, features, kwargs):
+            try:
+                outputs[i] = batcher.generate(features, **kwargs)
+            except ValueError as e:
+                outputs[i] = e
+
+        threads = [
+            threading.Thread(target=generate, args=(i, features, kwargs))
+            for i, (features, kwargs) in enumerate(inputs)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return outputs
+
+    def test_batching(self):
+        model = DummyModel()
+        batcher = GenerationBatcher(model, max_batch_size=4, max_wait=0.5)
+        outputs = self.run_concurrently(
+            batcher, [(torch.full((1, 2), float(i)), {}) for i in range(4)])
+        self.assertEqual(model.batch_sizes, [4])
+        for i, output in enumerate(outputs):
+            self.assertEqual(output.tolist(), [i] * 3)
+
+    def test_different_arguments(self):
+        """ Test that requests with different generation arguments are not batched together. """
+        model = DummyModel()
+        batcher = GenerationBatcher(model, max_batch_size=4, max_wait=0.5)
+        outputs = self.run_concurrently(batcher, [
+            (torch.full((1, 2), 1.), {"max_new_tokens": 2}),
+            (torch.full((1, 2), 2.), {"max_new_tokens": 4}),
+            (torch.full((1, 2), 3.), {"max_new_tokens": 2}),
+            (torch.full((1, 3), 4.), {"max_new_tokens": 2})])
+        self.assertEqual(sorted(model.batch_sizes), [1, 1, 2])
+        self.assertEqual(
+            [output.tolist() for output in outputs], [[1, 1], [2, 2, 2, 2], [3, 3], [4, 4]])
+
+    def test_error(self):
+        """ Test that errors are raised to the threads requesting the failed batch. """
+        model = DummyModel()
+        batcher = GenerationBatcher(model, max_batch_size=2, max_wait=0.5)
+        outputs = self.run_concurrently(
+            batcher, [(torch.full((1, 2), -1.), {}), (torch.full((1, 2), 1.), {})])
+        self.assertIsInstance(outputs[0], ValueError)
+        self.assertIsInstance(outputs[1], ValueError)
+        self.assertEqual(batcher.generate(torch.full((1, 2), 5.)).tolist(), [5, 5, 5])
+
+    def test_forked_process(self):
+        """ Test that the batcher works in processes forked after it has been used. """
+        batcher = GenerationBatcher(DummyModel(), max_batch_size=2)
+        self.assertEqual(batcher.generate(torch.full((1, 2), 1.)).tolist(), [1, 1, 1])
+        context = multiprocessing.get_context("fork")
+        results = context.Queue()
+        process = context.Process(
+            target=lambda: results.put(batcher.generate(torch.full((1, 2), 2.)).tolist()))
+        process.start()
+        try:
+            self.assertEqual(results.get(timeout=30), [2, 2, 2])
+        finally:
+            process.terminate()
+            process.join()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+# Copyright 2026 FBK
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+from simulstream.server.speech_processors.seamless_streamatt import SeamlessStreamAtt
+
+
+class TestAudioHistory(unittest.TestCase):
+    def setUp(self):
+        self.processor = SeamlessStreamAtt(SimpleNamespace(text_history=SimpleNamespace(
+            type="simulstream.server.speech_processors.base_streamatt.FixedWordsTextHistory",
+            history_words=10)))
+
+    def test_same_as_concatenation(self):
+        """
+        Test that the audio history is the concatenation of the features, also when it is cut at
+        the beginning as done in `_update_speech_history`.
+        """
+        rng = np.random.default_rng(42)
+        expected_history = np.zeros((0, 4), dtype=np.float32)
+        for num_frames, frames_to_cut in [
+                (10, 0), (25, 5), (1, 0), (50, 70), (3, 0), (100, 2), (7, 100), (30, 0)]:
+            new_features = rng.standard_normal((num_frames, 4)).astype(np.float32)
+            self.processor._append_to_audio_history(new_features)
+            expected_history = np.concatenate((expected_history, new_features))
+            np.testing.assert_array_equal(self.processor.audio_history, expected_history)
+            self.processor.audio_history = self.processor.audio_history[frames_to_cut:]
+            expected_history = expected_history[frames_to_cut:]
+
+    def test_clear(self):
+        self.processor._append_to_audio_history(np.ones((10, 4), dtype=np.float32))
+        self.processor.clear()
+        self.processor._append_to_audio_history(np.full((3, 4), 2, dtype=np.float32))
+        np.testing.assert_array_equal(
+            self.processor.audio_history, np.full((3, 4), 2, dtype=np.float32))
+
+
+if __name__ == "__main__":
+    unittest.main()
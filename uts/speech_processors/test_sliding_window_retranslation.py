@@ -0,0 +1,98 @@
+# Copyright 2026 FBK
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+import random
+import unittest
+from difflib import SequenceMatcher
+from types import SimpleNamespace
+
+import numpy as np
+
+from simulstream.server.speech_processors import SAMPLE_RATE
+from simulstream.server.speech_processors.sliding_window_retranslation import longest_match, \
+    SlidingWindowRetranslator
+
+
+class TestLongestMatch(unittest.TestCase):
+    def assert_same_as_sequence_matcher(self, a, b):
+        expected = SequenceMatcher(None, a, b, autojunk=False).find_longest_match()
+        self.assertEqual(longest_match(a, b), expected)
+
+    def test_overlapping_windows(self):
+        self.assert_same_as_sequence_matcher(
+            ["▁I", "▁am", "▁Sara", "▁and", "▁I"],
+            ["▁Sara", "▁and", "▁I", "▁live", "▁in", "▁Rome"])
+
+    def test_no_match(self):
+        self.assert_same_as_sequence_matcher(["▁Hi", "!"], ["▁Hello", "."])
+        self.assert_same_as_sequence_matcher([], ["▁Hello", "."])
+        self.assert_same_as_sequence_matcher(["▁Hi", "!"], [])
+
+    def test_ties(self):
+        """ Test that equally long matches are resolved as in SequenceMatcher. """
+        self.assert_same_as_sequence_matcher(["a", "b", "x", "a", "b"], ["a", "b", "y", "a", "b"])
+        self.assert_same_as_sequence_matcher(["a", "a", "a"], ["a", "a"])
+
+    def test_random(self):
+        rnd = random.Random(42)
+        for _ in range(200):
+            a = [rnd.choice("abcd") for _ in range(rnd.randint(0, 30))]
+            b = [rnd.choice("abcd") for _ in range(rnd.randint(0, 30))]
+            self.assert_same_as_sequence_matcher(a, b)
+
+
+class DummySlidingWindowRetranslator(SlidingWindowRetranslator):
+    @classmethod
+    def load_model(cls, config):
+        pass
+
+    def _preprocess(self, waveform):
+        return self._append_to_audio_history(waveform)
+
+    def _generate(self, speech):
+        return []
+
+    def tokens_to_string(self, tokens):
+        return " ".join(tokens)
+
+    def set_source_language(self, language):
+        pass
+
+    def set_target_language(self, language):
+        pass
+
+
+class TestAudioHistory(unittest.TestCase):
+    def test_same_as_concatenation(self):
+        """ Test that the audio history is the last window of all the audio received. """
+        processor = DummySlidingWindowRetranslator(SimpleNamespace(window_len=1))
+        rng = np.random.default_rng(42)
+        all_audio = np.zeros(0, dtype=np.float32)
+        for chunk_len in [1000, 5000, 9999, 1, 16000, 20000, 300, 15700, 0, 8000]:
+            waveform = rng.standard_normal(chunk_len).astype(np.float32)
+            all_audio = np.concatenate((all_audio, waveform))
+            history = processor._preprocess(waveform)
+            np.testing.assert_array_equal(history, all_audio[-SAMPLE_RATE:])
+            self.assertIs(history, processor.audio_history)
+
+    def test_clear(self):
+        processor = DummySlidingWindowRetranslator(SimpleNamespace(window_len=1))
+        processor._preprocess(np.ones(1000, dtype=np.float32))
+        processor.clear()
+        history = processor._preprocess(np.full(10, 2, dtype=np.float32))
+        np.testing.assert_array_equal(history, np.full(10, 2, dtype=np.float32))
+
+
+if __name__ == "__main__":
+    unittest.main()
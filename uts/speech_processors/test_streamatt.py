@@ -19,45 +19,83 @@ from simulstream.server.speech_processors.base_streamatt import PunctuationTextH
 
 
 class TestPunctuationTextHistory(unittest.TestCase):
-    def setUp(self):
-        self.config = SimpleNamespace()
-        self.punctuation_text_history = PunctuationTextHistory(self.config)
+    EN_PUNCTUATION_LAST = ("Hi", "!", "I", "am", "Sara", ".")
+    ZH_PUNCTUATION_LAST = ('担', '任', '开', '发', '主', '管', '。')
+    EN_PUNCTUATION_IN_BETWEEN = ("Hi", "!", "I", "am", "Sara")
+    ZH_PUNCTUATION_IN_BETWEEN = ('开', '发', '主', '管', '。', '担', '任')
+    EN_NO_STRONG_PUNCTUATION = ("Hi", ",", "I", "am", "Sara")
+    ZH_NO_STRONG_PUNCTUATION = ('回', '到', '纽', '约', '后', '，', '我')
+
+    @classmethod
+    def setUpClass(cls):
+        # the selection is stateless, so the same instance is shared by all the tests
+        cls.punctuation_text_history = PunctuationTextHistory(SimpleNamespace())
 
     def test_punctuation_last(self):
         """ Test PunctuationTextHistory method when the history ends with strong punctuation. """
         # Test word level
-        en_history = ["Hi", "!", "I", "am", "Sara", "."]
-        selected_history = self.punctuation_text_history.select_text_history(en_history)
-        self.assertEqual(selected_history, ["I", "am", "Sara", "."])
+        selected_history = self.punctuation_text_history.select_text_history(
+            self.EN_PUNCTUATION_LAST)
+        self.assertEqual(selected_history, ("I", "am", "Sara", "."))
 
         # Test character level
-        zh_history = ['担', '任', '开', '发', '主', '管', '。']
-        selected_history = self.punctuation_text_history.select_text_history(zh_history)
-        self.assertEqual(selected_history, ['担', '任', '开', '发', '主', '管', '。'])
+        selected_history = self.punctuation_text_history.select_text_history(
+            self.ZH_PUNCTUATION_LAST)
+        self.assertEqual(selected_history, self.ZH_PUNCTUATION_LAST)
 
     def test_punctuation_in_between(self):
         """ Test PunctuationTextHistory method when punctuation separates two sentences. """
         # Test word level
-        en_history = ["Hi", "!", "I", "am", "Sara"]
-        selected_history = self.punctuation_text_history.select_text_history(en_history)
-        self.assertEqual(selected_history, ["I", "am", "Sara"])
+        selected_history = self.punctuation_text_history.select_text_history(
+            self.EN_PUNCTUATION_IN_BETWEEN)
+        self.assertEqual(selected_history, ("I", "am", "Sara"))
 
         # Test character level
-        zh_history = ['开', '发', '主', '管', '。', '担', '任']
-        selected_history = self.punctuation_text_history.select_text_history(zh_history)
-        self.assertEqual(selected_history, ['担', '任'])
+        selected_history = self.punctuation_text_history.select_text_history(
+            self.ZH_PUNCTUATION_IN_BETWEEN)
+        self.assertEqual(selected_history, ('担', '任'))
 
     def test_no_strong_punctuation(self):
         """ Test PunctuationTextHistory method when no strong punctuation is present. """
         # Test word level
-        en_history = ["Hi", ",", "I", "am", "Sara"]
-        selected_history = self.punctuation_text_history.select_text_history(en_history)
-        self.assertEqual(selected_history, ["Hi", ",", "I", "am", "Sara"])
+        selected_history = self.punctuation_text_history.select_text_history(
+            self.EN_NO_STRONG_PUNCTUATION)
+        self.assertEqual(selected_history, self.EN_NO_STRONG_PUNCTUATION)
 
         # Test character level
-        zh_history = ['回', '到', '纽', '约', '后', '，', '我']
-        selected_history = self.punctuation_text_history.select_text_history(zh_history)
-        self.assertEqual(selected_history, ['回', '到', '纽', '约', '后', '，', '我'])
+        selected_history = self.punctuation_text_history.select_text_history(
+            self.ZH_NO_STRONG_PUNCTUATION)
+        self.assertEqual(selected_history, self.ZH_NO_STRONG_PUNCTUATION)
+
+    def test_list_history(self):
+        """ Test that lists, as used by StreamAtt, are selected as lists. """
+        selected_history = self.punctuation_text_history.select_text_history(
+            list(self.EN_PUNCTUATION_IN_BETWEEN))
+        self.assertEqual(selected_history, ["I", "am", "Sara"])
+
+    def test_long_history(self):
+        """ Test long histories, whose first tokens are searched all at once. """
+        history = ["▁word"] * 10_000
+        self.assertEqual(
+            self.punctuation_text_history.select_text_history(history), history)
+        for punctuation_index in [0, 5000, 9998 - PunctuationTextHistory.LONG_HISTORY_SCAN_LEN,
+                                  9999 - PunctuationTextHistory.LONG_HISTORY_SCAN_LEN, 9998]:
+            long_history = history.copy()
+            long_history[punctuation_index] = "▁end."
+            selected_history = self.punctuation_text_history.select_text_history(long_history)
+            self.assertEqual(selected_history, long_history[punctuation_index + 1:])
+
+    def test_cache_hit(self):
+        """ Test that selecting the same history again is served by the cache. """
+        punctuation_text_history = PunctuationTextHistory(SimpleNamespace())
+        first_selection = punctuation_text_history.select_text_history(
+            list(self.EN_PUNCTUATION_IN_BETWEEN))
+        second_selection = punctuation_text_history.select_text_history(
+            list(self.EN_PUNCTUATION_IN_BETWEEN))
+        self.assertEqual(first_selection, second_selection)
+        cache_info = punctuation_text_history._retained_history_start.cache_info()
+        self.assertEqual(cache_info.hits, 1)
+        self.assertEqual(cache_info.misses, 1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,93 @@
+# Copyright 2026 FBK
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License
+
+import unittest
+
+import numpy as np
+
+from simulstream.server.message_processor import MessageProcessor
+from simulstream.server.speech_processors import SpeechProcessor, SAMPLE_RATE
+from simulstream.server.speech_processors.incremental_output import IncrementalOutput
+
+
+class RecordingSpeechProcessor(SpeechProcessor):
+    """ Records the number of samples received with each chunk. """
+    def __init__(self):
+        super().__init__(None)
+        self.chunk_lengths = []
+
+    @property
+    def speech_chunk_size(self) -> float:
+        return 0.5
+
+    @classmethod
+    def load_model(cls, config):
+        pass
+
+    def process_chunk(self, waveform):
+        self.chunk_lengths.append(len(waveform))
+        return IncrementalOutput([], "", [], "")
+
+    def set_source_language(self, language):
+        pass
+
+    def set_target_language(self, language):
+        pass
+
+    def end_of_stream(self):
+        return IncrementalOutput([], "", [], "")
+
+    def tokens_to_string(self, tokens):
+        return " ".join(tokens)
+
+    def clear(self):
+        pass
+
+
+class TestSampleRate(unittest.TestCase):
+    def setUp(self):
+        self.speech_processor = RecordingSpeechProcessor()
+        self.message_processor = MessageProcessor(0, self.speech_processor)
+
+    def send_audio(self, sample_rate, seconds):
+        self.message_processor.process_speech(
+            np.zeros(int(sample_rate * seconds), dtype=np.int16).tobytes())
+
+    def test_same_sample_rate_resent(self):
+        """ Test that sending again the same sample rate does not drop any audio. """
+        for _ in range(10):
+            self.message_processor.process_metadata({"sample_rate": 44100})
+            self.send_audio(44100, 0.5)
+        self.message_processor.end_of_stream()
+        self.assertEqual(sum(self.speech_processor.chunk_lengths), 5 * SAMPLE_RATE)
+
+    def test_sample_rate_change(self):
+        """
+        Test that the audio received before a change of the sample rate is processed with the
+        next chunk.
+        """
+        self.message_processor.process_metadata({"sample_rate": 44100})
+        self.send_audio(44100, 0.5)
+        self.send_audio(44100, 0.25)
+        self.message_processor.process_metadata({"sample_rate": 8000})
+        self.assertEqual(self.message_processor.processed_audio_seconds, 0.75)
+        self.send_audio(8000, 0.25)
+        # the pending audio counts towards the chunk size
+        self.assertEqual(len(self.speech_processor.chunk_lengths), 2)
+        self.message_processor.end_of_stream()
+        self.assertEqual(sum(self.speech_processor.chunk_lengths), SAMPLE_RATE)
+
+
+if __name__ == "__main__":
+    unittest.main()